@@ -1,19 +1,26 @@
-from swarm import Swarm, Agent
-from openai import OpenAI
-from httpx import Client
+import functools
 import os
 
-client = Swarm(
-    client=OpenAI(
-        http_client=Client(
-            headers={
-                "Invariant-Authorization": "Bearer "
-                + os.getenv("INVARIANT_API_KEY", "local-does-not-need-api-keys")
-            }
-        ),
-        base_url="http://localhost/api/v1/gateway/sample-agent/openai",
+from httpx import Client, Limits
+from openai import OpenAI
+from swarm import Agent, Swarm
+
+
+@functools.lru_cache(maxsize=1)
+def get_client() -> Swarm:
+    # created lazily and once per process, so repeated runs reuse the same connection pool
+    return Swarm(
+        client=OpenAI(
+            http_client=Client(
+                headers={
+                    "Invariant-Authorization": "Bearer "
+                    + os.getenv("INVARIANT_API_KEY", "local-does-not-need-api-keys")
+                },
+                limits=Limits(max_keepalive_connections=8),
+            ),
+            base_url="http://localhost/api/v1/gateway/sample-agent/openai",
+        )
     )
-)
 
 
 def get_weather():
@@ -26,10 +33,16 @@ agent = Agent(
     functions=[get_weather],
 )
 
-response = client.run(
-    agent=agent,
-    messages=[{"role": "user", "content": "What's the weather?"}],
-)
 
-print(response.messages[-1]["content"])
-# Output: "It seems to be sunny."
+def run(prompt: str):
+    return get_client().run(
+        agent=agent,
+        messages=[{"role": "user", "content": prompt}],
+    )
+
+
+if __name__ == "__main__":
+    response = run("What's the weather?")
+
+    print(response.messages[-1]["content"])
+    # Output: "It seems to be sunny."
@@ -1,9 +1,13 @@
-import json
 import base64
+import mmap
 
-# Open and convert the image to base64
-with open("inv_labs_screen.png", "rb") as image_file:
-    encoded_string = base64.b64encode(image_file.read()).decode('utf-8')
+import orjson
+
+# Open and convert the image to base64 (encoding directly from the memory-mapped file)
+with open("inv_labs_screen.png", "rb") as image_file, mmap.mmap(
+    image_file.fileno(), 0, access=mmap.ACCESS_READ
+) as image_data:
+    encoded_string = base64.b64encode(image_data).decode('utf-8')
 
 trace_1 = {"messages":[
   {
@@ -128,6 +132,6 @@ trace_3 = {
 
 traces = [trace_1, trace_2, trace_3]
 
-with open("sample_data.jsonl", "w") as f:
+with open("sample_data.jsonl", "wb") as f:
     for trace in traces:
-        f.write(json.dumps(trace) + "\n")
+        f.write(orjson.dumps(trace) + b"\n")
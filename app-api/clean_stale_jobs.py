@@ -5,8 +5,7 @@ Run this script directly from the server to clean up stale jobs.
 """
 
 import asyncio
-from models.datasets_and_traces import db, DatasetJob
-from sqlalchemy.orm import Session
+from models.datasets_and_traces import db_session, DatasetJob
 from routes.jobs import cleanup_stale_jobs
 
 async def main():
@@ -16,7 +15,7 @@ async def main():
     print("Done cleaning up stale jobs!")
 
     # Count remaining jobs
-    with Session(db()) as session:
+    with db_session() as session:
         remaining_jobs = session.query(DatasetJob).count()
         print(f"Remaining jobs: {remaining_jobs}")
 
@@ -1,15 +1,31 @@
 """Database manager singleton class."""
 
+import json
 import os
 import threading
+from concurrent.futures import ThreadPoolExecutor
 
-from sqlalchemy import create_engine
+import orjson
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import sessionmaker
+
+
+def _json_serializer(obj) -> str:
+    """
+    Encodes values of JSON columns with orjson, falling back to the stdlib json
+    module for values orjson rejects (integers wider than 64 bits).
+    """
+    try:
+        return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode()
+    except TypeError:
+        return json.dumps(obj)
 
 
 class DatabaseManager:
     """Singleton class for the SQLAlchemy engine."""
 
     _engine = None
+    _session_factory = None
     _lock = threading.Lock()
 
     def __new__(cls):
@@ -26,11 +42,60 @@ class DatabaseManager:
                         DatabaseManager.get_db_url(),
                         pool_size=int(os.environ.get("DB_POOL_SIZE", 10)),
                         max_overflow=int(os.environ.get("DB_MAX_OVERFLOW", 5)),
+                        # fail fast instead of blocking indefinitely when the pool is exhausted
+                        pool_timeout=float(os.environ.get("DB_POOL_TIMEOUT", 5.0)),
+                        # reuse the most recently returned connections first, so idle ones can expire
+                        pool_use_lifo=True,
                         pool_recycle=1800,
                         pool_pre_ping=True,
+                        # trace contents and metadata are serialized on every write; reads keep
+                        # the stdlib decoder, as orjson turns integers wider than 64 bits into
+                        # floats and rejects numbers out of double range (e.g. 1e400)
+                        json_serializer=_json_serializer,
+                        json_deserializer=json.loads,
                     )
         return DatabaseManager._engine
 
+    @staticmethod
+    def get_session_factory():
+        """Return the single sessionmaker bound to the engine."""
+        if DatabaseManager._session_factory is None:
+            engine = DatabaseManager.get_engine()
+            with DatabaseManager._lock:
+                if DatabaseManager._session_factory is None:
+                    DatabaseManager._session_factory = sessionmaker(bind=engine)
+        return DatabaseManager._session_factory
+
+    @staticmethod
+    def warm_up_pool():
+        """
+        Open pool_size connections up front (concurrently), so that the first requests do
+        not pay for connecting.
+        """
+        engine = DatabaseManager.get_engine()
+
+        def connect():
+            connection = engine.connect()
+            try:
+                connection.execute(text("SELECT 1"))
+            except Exception:
+                connection.close()
+                raise
+            return connection
+
+        # all connections are checked out at the same time, so each one is opened
+        # instead of being handed back from the pool
+        pool_size = engine.pool.size()
+        with ThreadPoolExecutor(max_workers=pool_size) as executor:
+            futures = [executor.submit(connect) for _ in range(pool_size)]
+        try:
+            for future in futures:
+                future.result()
+        finally:
+            for future in futures:
+                if future.exception() is None:
+                    future.result().close()
+
     @staticmethod
     def get_db_url():
         """Return the database URL."""
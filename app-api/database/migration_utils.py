@@ -0,0 +1,37 @@
+"""Helpers shared by data migrations in database/versions."""
+
+import sqlalchemy as sa
+from alembic import context, op
+
+# rows rewritten per transaction by chunked_update
+UPDATE_CHUNK_SIZE = 10_000
+
+
+def chunked_update(
+    table: str, set_clause: str, predicate: str, chunk: int = UPDATE_CHUNK_SIZE
+) -> None:
+    """
+    Runs 'UPDATE {table} SET {set_clause} WHERE {predicate}' in batches of at most
+    `chunk` rows, committing after each batch. This keeps row locks and WAL per
+    transaction bounded on large tables.
+
+    The update must make rows stop matching `predicate`, otherwise the loop does not terminate.
+    """
+    if context.is_offline_mode():
+        # no connection to loop on when generating SQL scripts, emit a single statement
+        op.execute(f"UPDATE {table} SET {set_clause} WHERE {predicate}")
+        return
+
+    statement = sa.text(f"""
+    WITH batch AS (
+        SELECT ctid FROM {table} WHERE {predicate} LIMIT {int(chunk)} FOR UPDATE
+    )
+    UPDATE {table} SET {set_clause}
+    WHERE ctid = ANY(ARRAY(SELECT ctid FROM batch))
+    """)
+    with op.get_context().autocommit_block():
+        connection = op.get_bind()
+        while True:
+            result = connection.execute(statement)
+            if result.rowcount < chunk:
+                break
@@ -0,0 +1,51 @@
+"""add ordered dataset index on traces
+
+Revision ID: 5d3a8e1f6c27
+Revises: 7c1e5d2a9b40
+Create Date: 2026-10-17 11:41:09.227816
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "5d3a8e1f6c27"
+down_revision: Union[str, None] = "7c1e5d2a9b40"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # (dataset_id, index) returns a dataset's traces already in order, and also covers
+    # all lookups by dataset_id, so it replaces the single-column index; built
+    # concurrently so writes to traces are not blocked while it is created
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "idx_traces_dataset_id_index",
+            "traces",
+            ["dataset_id", "index"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "idx_traces_dataset_id", table_name="traces", postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "idx_traces_dataset_id",
+            "traces",
+            ["dataset_id"],
+            unique=False,
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "idx_traces_dataset_id_index",
+            table_name="traces",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,30 @@
+"""add index on api key hashes
+
+Revision ID: 7c1e5d2a9b40
+Revises: 4a18807f9aad
+Create Date: 2026-10-17 10:12:41.518203
+
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision: str = "7c1e5d2a9b40"
+down_revision: Union[str, None] = "4a18807f9aad"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # API keys are looked up by hash on every authenticated push, but hashed_key is only
+    # the second column of the primary key, so it needs its own index
+    op.create_index(
+        "idx_api_keys_hashed_key", "api_keys", ["hashed_key"], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("idx_api_keys_hashed_key", table_name="api_keys")
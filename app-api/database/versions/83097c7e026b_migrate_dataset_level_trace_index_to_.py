@@ -21,34 +21,29 @@ depends_on: Union[str, Sequence[str], None] = None
 def upgrade():
     connection = op.get_bind()
 
-    # Step 1: Get all dataset_id values (casted as TEXT since they are UUIDs)
-    dataset_ids = connection.execute(
-        sa.text(
-            "SELECT DISTINCT dataset_id::TEXT FROM traces WHERE dataset_id IS NOT NULL"
-        )
-    ).fetchall()
-
-    # Step 2: Create a sequence for each dataset_id and set it to start at MAX(index) + 1
-    for (dataset_id,) in dataset_ids:
-        max_index = connection.execute(
-            sa.text(
-                "SELECT COALESCE(MAX(index), -1) FROM traces WHERE dataset_id = :dataset_id"
-            ),
-            {"dataset_id": dataset_id},
-        ).scalar()
-        next_index = max_index + 1
-
-        sequence_name = f"dataset_seq_{dataset_id.replace('-', '_')}"
-
-        # Drop the sequence if it already exists (to avoid conflicts)
-        connection.execute(sa.text(f"DROP SEQUENCE IF EXISTS {sequence_name}"))
-
-        # Create a new sequence starting from the next index
-        connection.execute(
-            sa.text(
-                f"CREATE SEQUENCE {sequence_name} START WITH {next_index} MINVALUE 0"
-            )
-        )
+    # Step 1+2: Create a sequence for each dataset_id and set it to start at MAX(index) + 1
+    # (computed set-based in a single server-side statement, instead of a round-trip per dataset)
+    connection.execute(
+        sa.text("""
+    DO $$
+    DECLARE
+        r RECORD;
+    BEGIN
+        FOR r IN
+            SELECT replace(dataset_id::TEXT, '-', '_') AS seq_suffix, COALESCE(MAX(index), -1) + 1 AS next_index
+            FROM traces
+            WHERE dataset_id IS NOT NULL
+            GROUP BY dataset_id
+        LOOP
+            -- Drop the sequence if it already exists (to avoid conflicts)
+            EXECUTE format('DROP SEQUENCE IF EXISTS dataset_seq_%s', r.seq_suffix);
+            -- Create a new sequence starting from the next index
+            EXECUTE format('CREATE SEQUENCE dataset_seq_%s START WITH %s MINVALUE 0', r.seq_suffix, r.next_index);
+        END LOOP;
+    END
+    $$;
+    """)
+    )
 
     # Step 3: Create the trigger function
     connection.execute(
@@ -119,12 +114,20 @@ def downgrade():
     connection.execute(sa.text("DROP FUNCTION IF EXISTS set_trace_index;"))
 
     # Step 3: Drop all dataset sequences
-    dataset_ids = connection.execute(
-        sa.text(
-            "SELECT DISTINCT dataset_id::TEXT FROM traces WHERE dataset_id IS NOT NULL"
-        )
-    ).fetchall()
-
-    for (dataset_id,) in dataset_ids:
-        sequence_name = f"dataset_seq_{dataset_id.replace('-', '_')}"
-        connection.execute(sa.text(f"DROP SEQUENCE IF EXISTS {sequence_name}"))
+    connection.execute(
+        sa.text("""
+    DO $$
+    DECLARE
+        r RECORD;
+    BEGIN
+        FOR r IN
+            SELECT DISTINCT replace(dataset_id::TEXT, '-', '_') AS seq_suffix
+            FROM traces
+            WHERE dataset_id IS NOT NULL
+        LOOP
+            EXECUTE format('DROP SEQUENCE IF EXISTS dataset_seq_%s', r.seq_suffix);
+        END LOOP;
+    END
+    $$;
+    """)
+    )
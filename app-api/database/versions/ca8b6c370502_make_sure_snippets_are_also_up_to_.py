@@ -10,6 +10,8 @@ from typing import Sequence, Union
 from alembic import op
 import sqlalchemy as sa
 
+from database.migration_utils import chunked_update
+
 
 # revision identifiers, used by Alembic.
 revision: str = 'ca8b6c370502'
@@ -17,26 +19,22 @@ down_revision: Union[str, None] = 'bb590e17b7fc'
 branch_labels: Union[str, Sequence[str], None] = None
 depends_on: Union[str, Sequence[str], None] = None
 
+# content of a JSON string value, with the outer quotes stripped and escapes decoded in one pass
+UNWRAPPED_METADATA = "(extra_metadata #>> '{}')"
+
+UNWRAP_METADATA = f"""extra_metadata = CASE
+        WHEN {UNWRAPPED_METADATA} IS JSON THEN ({UNWRAPPED_METADATA})::json
+        ELSE json_build_object('old_data', {UNWRAPPED_METADATA})
+    END"""
+IS_JSON_STRING = "left(extra_metadata::text, 1) = '\"' AND right(extra_metadata::text, 1) = '\"'"
+
 
 def upgrade() -> None:
-    op.execute("""
-                CREATE OR REPLACE FUNCTION to_json(str text) RETURNS json LANGUAGE PLPGSQL
-                AS $$
-                DECLARE
-                    j json;
-                BEGIN
-                    j := str::json;
-                    return j;
-                EXCEPTION WHEN OTHERS THEN return ('{old_data: }'||str)::json;
-                END
-                $$;
-               """)
-
-    op.execute("""
-    UPDATE traces
-    SET extra_metadata=to_json(replace(substr(extra_metadata::text, 2, length(extra_metadata::text) - 2), '\"', '"' ))
-    WHERE extra_metadata::text LIKE '"%"'
-    """)
+    # JSON strings are unwrapped and parsed with set-based UPDATEs, committed in batches; values that do
+    # not parse as JSON are kept as {"old_data": <raw string>}
+    chunked_update("traces", UNWRAP_METADATA, IS_JSON_STRING)
+    # refresh planner statistics for the rewritten column
+    op.execute("ANALYZE traces (extra_metadata);")
 
 
 def downgrade() -> None:
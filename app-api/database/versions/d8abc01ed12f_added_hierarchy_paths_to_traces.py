@@ -19,7 +19,9 @@ depends_on: Union[str, Sequence[str], None] = None
 
 
 def upgrade() -> None:
-    op.add_column('traces', sa.Column('hierarchy_path', sa.ARRAY(sa.String()), nullable=False, default=[], server_default='{}'))
+    # the server default is a constant, so on PostgreSQL 11+ this is a metadata-only change
+    # (existing rows are not rewritten and no backfill is needed)
+    op.add_column('traces', sa.Column('hierarchy_path', sa.ARRAY(sa.String()), nullable=False, default=[], server_default=sa.text("'{}'::varchar[]")))
 
 
 def downgrade() -> None:
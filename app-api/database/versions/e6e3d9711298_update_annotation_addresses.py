@@ -10,6 +10,8 @@ from typing import Sequence, Union
 from alembic import op
 import sqlalchemy as sa
 
+from database.migration_utils import chunked_update
+
 
 # revision identifiers, used by Alembic.
 revision: str = 'e6e3d9711298'
@@ -20,10 +22,25 @@ depends_on: Union[str, Sequence[str], None] = None
 
 def upgrade() -> None:
     # note: this does not support .n -> :Ln with n != 0, but we didn't have any of those at the time of migration
-    op.execute("UPDATE annotations SET address = (substr(address, 0, length(address) - 1) || '\:L0') WHERE address LIKE '%.0';")
-    op.execute("UPDATE annotations SET address = replace(address, 'message[', 'messages[') WHERE address LIKE '%message[%';")
+    # both rewrites (.0 -> :L0 and message[ -> messages[) are applied in a single pass over annotations
+    chunked_update(
+        "annotations",
+        "address = replace("
+        "CASE WHEN right(address, 2) = '.0' THEN substr(address, 0, length(address) - 1) || '\\:L0' ELSE address END, "
+        "'message[', 'messages[')",
+        "right(address, 2) = '.0' OR strpos(address, 'message[') > 0",
+    )
+    # refresh planner statistics for the rewritten column
+    op.execute("ANALYZE annotations (address);")
 
 
 def downgrade() -> None:
-    op.execute("UPDATE annotations SET address = replace(address, 'messages[', 'message[') WHERE address LIKE '%messages[%';")
-    op.execute("UPDATE annotations SET address = replace(address, '\:L0', '.0') WHERE address LIKE '%:L0';")
+    chunked_update(
+        "annotations",
+        "address = "
+        "CASE WHEN right(address, 3) = '\\:L0' THEN replace(replace(address, 'messages[', 'message['), '\\:L0', '.0') "
+        "ELSE replace(address, 'messages[', 'message[') END",
+        "strpos(address, 'messages[') > 0 OR right(address, 3) = '\\:L0'",
+    )
+    # refresh planner statistics for the rewritten column
+    op.execute("ANALYZE annotations (address);")
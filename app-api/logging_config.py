@@ -1,15 +1,37 @@
 # Configuration for logging in the application
 
+import atexit
 import logging
+import logging.handlers
+import queue
 import sys
 
-# Configure logging once
+# the log format does not use thread or process information, so skip collecting it per record
+logging.logThreads = False
+logging.logProcesses = False
+logging.logMultiprocessing = False
+
+# Configure logging once: records are only enqueued on the calling thread, formatting
+# and writing to stdout happens on a background listener thread
+log_queue = queue.Queue(-1)
+stream_handler = logging.StreamHandler(sys.stdout)
+stream_handler.setFormatter(
+    logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s")
+)
+log_listener = logging.handlers.QueueListener(
+    log_queue, stream_handler, respect_handler_level=True
+)
+
 logging.basicConfig(
     level=logging.INFO,
-    format="%(asctime)s - %(levelname)s - %(name)s - %(message)s",
-    handlers=[logging.StreamHandler(sys.stdout)],
+    # the queue handler only renders the message (and traceback), the listener adds the rest
+    format="%(message)s",
+    handlers=[logging.handlers.QueueHandler(log_queue)],
 )
 
+log_listener.start()
+atexit.register(log_listener.stop)
+
 
 def get_logger(name: str):
     """Returns a logger instance with the given name"""
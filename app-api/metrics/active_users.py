@@ -2,9 +2,10 @@
 Prometheus count and middleware to track active users (anonymous or authenticated) in the last 5 minutes.
 """
 
-import datetime
+import time
+from collections import OrderedDict
 
-from fastapi import Request
+from fastapi import HTTPException, Request
 from prometheus_client import Gauge
 from routes.auth import UserIdentity
 
@@ -27,32 +28,41 @@ active_anonymous_users = Gauge(
 # set that automatically removes elements after a certain time
 class max_live_set:
     def __init__(self, max_live=5 * 60):
-        self.elements = {}
+        # element -> time.monotonic() of the last access, ordered by it (the oldest elements come first)
+        self.elements = OrderedDict()
         self.max_live = max_live
 
-    def add(self, element):
-        self.cleanup(self.max_live)
-        self.elements[element] = datetime.datetime.now()
+    def add(self, element, now=None):
+        """
+        Adds (or refreshes) an element. If 'now' is passed, the caller is responsible for calling cleanup(now).
+        """
+        if now is None:
+            now = time.monotonic()
+            self.cleanup(now)
+        self.elements[element] = now
+        self.elements.move_to_end(element)
 
     def __contains__(self, element):
-        self.cleanup(self.max_live)
+        self.cleanup()
         return element in self.elements
 
     def __len__(self):
-        self.cleanup(self.max_live)
+        self.cleanup()
         return len(self.elements)
 
     def __iter__(self):
-        self.cleanup(self.max_live)
+        self.cleanup()
         return iter(self.elements)
 
-    def cleanup(self, timeout):
-        sorted_elements = sorted(self.elements.items(), key=lambda x: x[1])
-        for element, timestamp in sorted_elements:
-            if datetime.datetime.now() - timestamp > datetime.timedelta(
-                seconds=timeout
-            ):
-                del self.elements[element]
+    def cleanup(self, now=None):
+        if now is None:
+            now = time.monotonic()
+        cutoff = now - self.max_live
+        # only the expired prefix of the (time-ordered) elements needs to be visited
+        while self.elements:
+            timestamp = next(iter(self.elements.values()))
+            if timestamp < cutoff:
+                self.elements.popitem(last=False)
             else:
                 break
 
@@ -61,29 +71,35 @@ class max_live_set:
 ACTIVE_USERS = max_live_set()
 ACTIVE_ANONYMOUS_USERS = max_live_set()
 
+# requests to paths ending in one of these are not counted as user activity
+IGNORED_PATH_SUFFIXES = ("/metrics", "/user/identity")
+
 
 def install_metrics_middleware(app):
     @app.middleware("http")
     async def count_active_users(request: Request, call_next):
         try:
+            # the result is kept on the request state, so the route's UserIdentity dependency reuses it
             user_id = await UserIdentity(request)
-        except Exception:
+        except HTTPException:
             user_id = None
 
         userid = user_id or request.headers.get("x-forwarded-for", "anonymous")
 
+        # expire old entries once per request (instead of on every set access below)
+        now = time.monotonic()
+        ACTIVE_USERS.cleanup(now)
+        ACTIVE_ANONYMOUS_USERS.cleanup(now)
+
         # ignore the /metrics endpoint and user identity checks by other services
-        if (
-            not request.url.path.endswith("/metrics")
-            and not request.url.path.endswith("/user/identity")
-            or request.url.path == "/api/v1/"
-        ):
-            ACTIVE_USERS.add(userid)
+        path = request.scope.get("path", "")
+        if not path.endswith(IGNORED_PATH_SUFFIXES) or path == "/api/v1/":
+            ACTIVE_USERS.add(userid, now=now)
             # track anonymous users in a separate set
             if user_id is None:
-                ACTIVE_ANONYMOUS_USERS.add(userid)
+                ACTIVE_ANONYMOUS_USERS.add(userid, now=now)
 
-        active_users.set(len(ACTIVE_USERS))
-        active_anonymous_users.set(len(ACTIVE_ANONYMOUS_USERS))
+        active_users.set(len(ACTIVE_USERS.elements))
+        active_anonymous_users.set(len(ACTIVE_ANONYMOUS_USERS.elements))
 
         return await call_next(request)
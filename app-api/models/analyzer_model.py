@@ -1,52 +1,92 @@
+import sys
 from enum import Enum
-from typing import Any, List, Literal
+from typing import Annotated, Any, List, Literal
 from uuid import UUID
-from typing import Optional
 
-from pydantic import BaseModel, Field, RootModel
+from pydantic import (
+    AfterValidator,
+    BaseModel,
+    ConfigDict,
+    Field,
+    RootModel,
+    field_validator,
+    model_validator,
+)
 
 
 class Annotation(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     content: str
     location: str | None = None
     severity: float | None
     status: str | None = None
 
+    @field_validator("status")
+    @classmethod
+    def intern_status(cls, v: str | None) -> str | None:
+        # only a handful of distinct statuses, share one copy of each
+        return sys.intern(v) if v is not None else None
+
+
+def intern_domain_prefix(domain: list[str]) -> list[str]:
+    # the dataset name and hierarchy path are shared by many samples, the last entry is
+    # the trace id, which is unique to the sample and not worth interning
+    return [sys.intern(d) for d in domain[:-1]] + domain[-1:]
+
+
+# hierarchical domain of a trace: dataset name, hierarchy path, trace id
+Domain = Annotated[list[str], AfterValidator(intern_domain_prefix)]
+
 
 class Sample(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     trace: str
     id: str
-    domain: list[str] = Field(default_factory=list)  # hierarchical domain of the trace
+    domain: Domain = Field(default_factory=list)
     annotations: list[Annotation]
 
 
 class InputSample(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     trace: str
     id: str
-    domain: list[str] = Field(default_factory=list)  # hierarchical domain of the trace
+    domain: Domain = Field(default_factory=list)
 
 
 class TraceAnalysis(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     id: str
     cost: float | None = None  # cost in usd of known
     annotations: list[Annotation]
 
 
 class Cluster(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     name: str | None = None
     issues_indexes: list[
         tuple[str, int]
     ]  # index of the issue, and then index of the annotation within the issue
 
     def issues(self, analysis_group: list[TraceAnalysis]) -> list[Annotation]:
+        by_id = {trace.id: trace for trace in analysis_group}
+        if len(by_id) != len(analysis_group):
+            raise ValueError("Expected unique trace ids in the analysis group")
+
         annotations: list[Annotation] = []
         for idx, j in self.issues_indexes:
-            correct_analysis = [trace for trace in analysis_group if trace.id == idx]
-            if len(correct_analysis) != 1:
+            trace = by_id.get(idx)
+            if trace is None:
+                raise ValueError(f"Expected 1 trace with id {idx}, found 0")
+            if j >= len(trace.annotations):
                 raise ValueError(
-                    f"Expected 1 trace with id {idx}, found {len(correct_analysis)}"
+                    f"Trace {idx} has no annotation at index {j} ({len(trace.annotations)} annotations)"
                 )
-            annotations.append(correct_analysis[0].annotations[j])
+            annotations.append(trace.annotations[j])
         return annotations
 
 
@@ -67,7 +107,10 @@ class ContaminationPolicyDefault(Enum):
     ALL = "all"
 
 
-ContaminationPolicy = ContaminationPolicyDefault | int
+# try the enum first and stop at the first match, instead of pydantic's smart mode probing both
+ContaminationPolicy = Annotated[
+    ContaminationPolicyDefault | int, Field(union_mode="left_to_right")
+]
 
 
 class JobRequest(BaseModel):
@@ -183,14 +226,20 @@ class PolicySynthesisRequest(BaseModel):
     apikey: str | None = None
 
 
-JobResponseUnion = (
-    CompletedAnalysisJobResponse
-    | CompletedPolicySynthesisJobResponse
+# completed jobs are further discriminated by their job type
+CompletedJobResponseUnion = Annotated[
+    CompletedAnalysisJobResponse | CompletedPolicySynthesisJobResponse,
+    Field(discriminator="type"),
+]
+
+JobResponseUnion = Annotated[
+    CompletedJobResponseUnion
     | FailedJobResponse
     | RunningJobResponse
     | CancelledJobResponse
-    | PendingJobResponse
-)
+    | PendingJobResponse,
+    Field(discriminator="status"),
+]
 
 
 class JobResponseParser(RootModel):
@@ -201,62 +250,28 @@ class JobResponseParser(RootModel):
 
     root: JobResponseUnion
 
+    @model_validator(mode="before")
     @classmethod
-    def validate_request(cls, v):
-        """Custom validator for job responses"""
-        if isinstance(v, dict):
-            status = v.get("status")
-
-            # Handle completed jobs with two-level discrimination
-            if status == JobStatus.COMPLETED:
-                # Add backward compatibility for responses without type
-                job_type = v.get("type")
-
-                # If type is missing, infer it from the fields
-                if not job_type:
-                    if "analysis" in v and "clustering" in v:
-                        job_type = JobType.ANALYSIS
-                        v["type"] = job_type
-                    elif "policy_code" in v and "success" in v:
-                        job_type = JobType.POLICY_SYNTHESIS
-                        v["type"] = job_type
-                    else:
-                        # Default to analysis for legacy responses
-                        job_type = JobType.ANALYSIS
-                        v["type"] = job_type
-
-                # Create appropriate completed job response
-                try:
-                    if job_type == JobType.ANALYSIS:
-                        return CompletedAnalysisJobResponse(**v)
-                    elif job_type == JobType.POLICY_SYNTHESIS:
-                        return CompletedPolicySynthesisJobResponse(**v)
-                except Exception as e:
-                    # If validation fails, try to adapt the response
-                    if job_type == JobType.POLICY_SYNTHESIS:
-                        # Ensure all required fields are present
-                        if "success" not in v:
-                            v["success"] = False
-                        if "policy_code" not in v:
-                            v["policy_code"] = ""
-                        if "detection_rate" not in v:
-                            v["detection_rate"] = 0.0
-                        return CompletedPolicySynthesisJobResponse(**v)
-                    # Re-raise if we can't adapt
-                    raise e
-
-            # Handle other job statuses
-            elif status == JobStatus.FAILED:
-                return FailedJobResponse(**v)
-            elif status == JobStatus.RUNNING:
-                return RunningJobResponse(**v)
-            elif status == JobStatus.CANCELLED:
-                return CancelledJobResponse(**v)
-            elif status == JobStatus.PENDING:
-                return PendingJobResponse(**v)
-
-            raise ValueError(f"Unknown job status: {status}")
-
+    def infer_completed_job_type(cls, v):
+        """Backward compatibility for completed job responses without a type (or incomplete policy results)"""
+        if not isinstance(v, dict) or v.get("status") != JobStatus.COMPLETED:
+            return v
+
+        v = dict(v)
+        # If type is missing, infer it from the fields (default to analysis for legacy responses)
+        if not v.get("type"):
+            if "analysis" in v and "clustering" in v:
+                v["type"] = JobType.ANALYSIS
+            elif "policy_code" in v and "success" in v:
+                v["type"] = JobType.POLICY_SYNTHESIS
+            else:
+                v["type"] = JobType.ANALYSIS
+
+        # Ensure all required fields of policy synthesis results are present
+        if v["type"] == JobType.POLICY_SYNTHESIS:
+            v.setdefault("success", False)
+            v.setdefault("policy_code", "")
+            v.setdefault("detection_rate", 0.0)
         return v
 
     def __init__(self, **data):
@@ -264,8 +279,7 @@ class JobResponseParser(RootModel):
             super().__init__(**data)
         else:
             # If root isn't provided, treat the data as if it were the root
-            validated_data = self.validate_request(data)
-            super().__init__(root=validated_data)
+            super().__init__(root=data)
 
 
 class AnalysisRequestOptions(BaseModel):
@@ -281,18 +295,3 @@ class AnalysisRequest(BaseModel):
 
     # analysis arguments
     options: AnalysisRequestOptions
-
-
-def cookies_xor_header(apikey: str | None = None, jwt: Optional[str] = None, default_headers: Optional[dict] = None) -> dict:
-    """
-    Helper function to create headers for analysis model requests.
-
-    Uses either an API key or JWT token for authentication (never both).
-    """
-    request_headers = default_headers.copy() if default_headers else {}
-    request_cookies = {}
-    if apikey:
-        request_headers["Authorization"] = f"Bearer {apikey}"
-    elif jwt:
-        request_headers["Cookie"] = f"jwt={jwt}"
-    return {'headers': request_headers, 'cookies': request_cookies}
\ No newline at end of file
@@ -1,6 +1,6 @@
 import datetime
 import hashlib
-import os
+import secrets
 import uuid
 
 from database.database_manager import DatabaseManager
@@ -15,6 +15,7 @@ from sqlalchemy import (
     Integer,
     String,
     UniqueConstraint,
+    insert,
 )
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.ext.hybrid import hybrid_property
@@ -23,7 +24,14 @@ from sqlalchemy.sql import func
 
 
 class Base(DeclarativeBase):
-    pass
+    @classmethod
+    def bulk_insert(cls, session, rows: list[dict]):
+        """
+        Inserts many rows (given as dicts of column values) with a single batched
+        INSERT, bypassing the per-object unit of work. Does not commit.
+        """
+        if rows:
+            session.execute(insert(cls), rows)
 
 
 class Dataset(Base):
@@ -76,7 +84,10 @@ class SavedQueries(Base):
 class Trace(Base):
     __objectname__ = "Trace"
     __tablename__ = "traces"
-    __table_args__ = (Index("idx_traces_dataset_id", "dataset_id"),)
+    __table_args__ = (
+        # serves per-dataset lookups and index-ordered listing
+        Index("idx_traces_dataset_id_index", "dataset_id", "index"),
+    )
 
     # key is uuid that auto creates
     id: Mapped[UUID] = mapped_column(
@@ -187,7 +198,10 @@ class SharedLinks(Base):
 class APIKey(Base):
     __objectname__ = "APIKeys"
     __tablename__ = "api_keys"
-    __table_args__ = (Index("idx_api_keys_user_id", "user_id"),)
+    __table_args__ = (
+        Index("idx_api_keys_user_id", "user_id"),
+        Index("idx_api_keys_hashed_key", "hashed_key", unique=True),
+    )
 
     # key id
     id: Mapped[UUID] = mapped_column(
@@ -214,8 +228,8 @@ class APIKey(Base):
 
     @staticmethod
     def generate_key():
-        # generate a random 32 character key
-        return "inv-" + hashlib.sha256(os.urandom(32)).hexdigest()
+        # generate a random key of 64 hex characters (32 bytes from the OS CSPRNG)
+        return "inv-" + secrets.token_hex(32)
 
 
 class DatasetPolicy(BaseModel):
@@ -233,7 +247,10 @@ class DatasetPolicy(BaseModel):
 
     # The timestamp when the policy was created or last updated (whichever is later).
     last_updated_time: str = Field(
-        default_factory=lambda: datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        # same "%Y-%m-%d %H:%M:%S" format, without going through strftime
+        default_factory=lambda: datetime.datetime.now().isoformat(
+            sep=" ", timespec="seconds"
+        )
     )
 
     def to_dict(self) -> dict:
@@ -285,3 +302,10 @@ def db():
     Returns a SQLAlchemy engine object that is connected to the database.
     """
     return DatabaseManager.get_engine()
+
+
+def db_session():
+    """
+    Returns a new Session from the shared session factory (use as a context manager).
+    """
+    return DatabaseManager.get_session_factory()()
@@ -4,16 +4,23 @@ This file contains the code to parse/import a trace dataset into a compatible fo
 It support both raw datasets and datasets with metadata and annotations.
 """
 
+import asyncio
 import datetime
-import json
+import itertools
 import uuid
-from typing import Dict
+from typing import Dict, Iterable
 
+import orjson
 from fastapi import HTTPException
 from models.datasets_and_traces import Annotation, Dataset, Trace
 from sqlalchemy.orm import Session
 from util.util import parse_and_update_messages
 
+# number of traces inserted per batch when importing a JSONL file
+IMPORT_BATCH_SIZE = 1000
+# number of traces of a batch whose rows (and images) are built at the same time
+IMPORT_CONCURRENCY = 32
+
 
 def create_dataset(user_id, name, metadata, is_public: bool = False):
     """Create a dataset with given parameters."""
@@ -24,13 +31,21 @@ def create_dataset(user_id, name, metadata, is_public: bool = False):
         extra_metadata=metadata,
         is_public=is_public,
     )
-    dataset.extra_metadata = metadata
     return dataset
 
 
-def validate_file_upload(lines: list[str]) -> Dict:
+def parse_lines(lines: Iterable[str] | Iterable[bytes]) -> list:
+    """
+    Parses each line of a JSONL file (a list of lines or a file object opened for reading).
+
+    All lines are parsed up front, as the whole file is validated before anything is imported.
+    """
+    return [orjson.loads(line) for line in lines]
+
+
+def validate_file_upload(parsed_lines: list) -> Dict:
     """
-    Performs validations on the uploaded file:
+    Performs validations on the uploaded file (given as the already parsed JSON lines):
     - Ensures the metadata row (if present) is the first row and appears exactly once.
     - Validates that the file follows either the raw event list format or the annotated event
     list format, but not both.
@@ -43,8 +58,7 @@ def validate_file_upload(lines: list[str]) -> Dict:
     indices_seen = set()
     metadata_seen = False
 
-    for line_number, line in enumerate(lines):
-        parsed_line = json.loads(line)
+    for line_number, parsed_line in enumerate(parsed_lines):
         # Check if the line is a metadata row.
         if (
             isinstance(parsed_line, dict)
@@ -105,11 +119,105 @@ def validate_file_upload(lines: list[str]) -> Dict:
     }
 
 
+async def raw_event_list_rows(
+    parsed_line, name: str, user_id, dataset_id, are_indices_present: bool
+) -> tuple[dict, list[dict], list]:
+    """
+    Returns the trace row, annotation rows and messages for a line in the raw event lists format.
+    """
+    # If it is a list, the first message may still contain trace metadata.
+    if (
+        isinstance(parsed_line, list)
+        and len(parsed_line) > 0
+        and isinstance(parsed_line[0], dict)
+        and "metadata" in parsed_line[0]
+    ):
+        # freshly parsed and not shared with anything else, no need to copy it
+        trace_metadata = parsed_line[0]["metadata"]
+        parsed_line = parsed_line[1:]
+    else:
+        trace_metadata = {}
+    # Otherwise, the list in this row, is the list of messages/events.
+    trace_id = uuid.uuid4()
+    parsed_messages = await parse_and_update_messages(name, trace_id, parsed_line)
+    trace = {
+        "id": trace_id,
+        "name": trace_metadata.get("name"),
+        "hierarchy_path": trace_metadata.get("hierarchy_path", []),
+        "user_id": user_id,
+        "dataset_id": dataset_id,
+        "content": parsed_messages,
+        "extra_metadata": trace_metadata,
+    }
+    return trace, [], parsed_line
+
+
+async def annotated_event_list_rows(
+    parsed_line, name: str, user_id, dataset_id, are_indices_present: bool
+) -> tuple[dict, list[dict], list]:
+    """
+    Returns the trace row, annotation rows and messages for a line in the annotated event lists format.
+    """
+    trace_metadata = parsed_line.get("metadata", {})
+    trace_id = uuid.uuid4()
+    parsed_messages = await parse_and_update_messages(
+        name, trace_id, parsed_line["messages"]
+    )
+    # values on the line take precedence over the trace metadata, which is only
+    # consulted (and the fallback only built) when the line does not set them
+    if "hierarchy_path" in parsed_line:
+        hierarchy_path = parsed_line["hierarchy_path"]
+    else:
+        hierarchy_path = trace_metadata.get("hierarchy_path", [])
+    if "name" in parsed_line:
+        trace_name = parsed_line["name"]
+    elif are_indices_present:
+        trace_name = trace_metadata.get("name", f"Run {parsed_line['index']}")
+    else:
+        trace_name = trace_metadata.get("name")
+    trace = {
+        "id": trace_id,
+        "name": trace_name,
+        "hierarchy_path": hierarchy_path,
+        "user_id": user_id,
+        "dataset_id": dataset_id,
+        "content": parsed_messages,
+        "extra_metadata": trace_metadata,
+    }
+    # If indices are present, in the jsonl file
+    # use them directly instead of relying on the Postgres sequence
+    # If indices are present - it has already been verified that
+    # they should be unique and all traces should have them
+    if are_indices_present:
+        trace["index"] = parsed_line["index"]
+
+    annotation_rows = []
+    for annotation in parsed_line.get("annotations", []):
+        # well-formed annotations are the common case, only handle the failure on lookup
+        try:
+            address, content = annotation["address"], annotation["content"]
+        except (KeyError, TypeError):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Failed to parse annotation: {annotation}",
+            )
+        annotation_rows.append(
+            {
+                "trace_id": trace_id,
+                "user_id": user_id,
+                "address": address,
+                "content": content,
+                "extra_metadata": annotation.get("extra_metadata", {}),
+            }
+        )
+    return trace, annotation_rows, parsed_line["messages"]
+
+
 async def import_jsonl(
     session: Session,
     name: str,
     user_id: str,
-    lines: list[str],
+    lines: Iterable[str] | Iterable[bytes],
     metadata: dict | None = None,
     existing_dataset=None,
     is_public: bool = False,
@@ -140,7 +248,7 @@ async def import_jsonl(
         session: The database session
         name: The name of the dataset
         user_id: The user ID
-        lines: The lines of the JSONL file
+        lines: The lines of the JSONL file, or a file object to read them from (raw bytes are parsed without decoding them first)
         metadata: Optional metadata to add to the dataset
         existing_dataset: Optional existing dataset to add traces to
         is_public: Whether the dataset is public
@@ -151,12 +259,15 @@ async def import_jsonl(
         If return_trace_data is True: Tuple of (dataset, trace_ids, messages)
     """
     metadata = {
-        "created_on": str(datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+        "created_on": datetime.datetime.now().isoformat(sep=" ", timespec="seconds"),
         **(metadata or {}),
     }
 
-    # Validate the file.
-    validation_result = validate_file_upload(lines)
+    # Parse every line once, validate the file before anything is written. orjson holds
+    # the GIL while parsing, so this gains nothing from a thread pool, but running it in a
+    # worker thread keeps large uploads from stalling the event loop.
+    parsed_lines = await asyncio.to_thread(parse_lines, lines)
+    validation_result = validate_file_upload(parsed_lines)
     # Save the metadata to the database.
     if existing_dataset is None:
         dataset = create_dataset(user_id, name, metadata, is_public)
@@ -168,100 +279,75 @@ async def import_jsonl(
     trace_ids = []
     all_messages = []
 
-    i = 0
-    for line in lines:
-        parsed_line = json.loads(line)
-        if i == 0 and validation_result["is_metadata_present"]:
-            metadata = {**metadata, **parsed_line["metadata"]}
-            dataset.extra_metadata = {
-                **dataset.extra_metadata,
-                **parsed_line["metadata"],
-            }
-        elif validation_result["has_raw_event_lists_format"]:
-            # If it is a list, the first message may still contain trace metadata.
-            if (
-                isinstance(parsed_line, list)
-                and len(parsed_line) > 0
-                and "metadata" in parsed_line[0].keys()
-            ):
-                trace_metadata = {**parsed_line[0]["metadata"]}
-                parsed_line = parsed_line[1:]
-            else:
-                trace_metadata = {}
-            # Otherwise, the list in this row, is the list of messages/events.
-            trace_id = uuid.uuid4()
-            parsed_messages = await parse_and_update_messages(
-                name, trace_id, parsed_line
-            )
-            trace = Trace(
-                id=trace_id,
-                name=trace_metadata.get("name"),
-                hierarchy_path=trace_metadata.get("hierarchy_path", []),
-                user_id=user_id,
-                dataset_id=dataset.id,
-                content=parsed_messages,
-                extra_metadata=trace_metadata,
-            )
-            session.add(trace)
+    # rows are collected and inserted in bulk batches (trace ids are generated here,
+    # so annotations can reference their trace without flushing it first)
+    trace_rows = []
+    annotation_rows = []
 
-            if return_trace_data:
-                trace_ids.append(str(trace_id))
-                all_messages.append(parsed_line)
-
-        elif validation_result["has_annotated_event_lists_format"]:
-            trace_metadata = parsed_line.get("metadata", {})
-            trace_id = uuid.uuid4()
-            parsed_messages = await parse_and_update_messages(
-                name, trace_id, parsed_line["messages"]
-            )
-            trace = Trace(
-                id=trace_id,
-                name=parsed_line.get("name", trace_metadata.get("name")),
-                hierarchy_path=parsed_line.get(
-                    "hierarchy_path", trace_metadata.get("hierarchy_path", [])
-                ),
-                user_id=user_id,
-                dataset_id=dataset.id,
-                content=parsed_messages,
-                extra_metadata=trace_metadata,
-            )
-            # If indices are present, in the jsonl file
-            # use them directly instead of relying on the Postgres sequence
-            # If indices are present - it has already been verified that
-            # they should be unique and all traces should have them
-            if validation_result["are_indices_present"]:
-                index = parsed_line.get("index")
-                trace.index = index
-                trace.name = parsed_line.get(
-                    "name", trace_metadata.get("name", f"Run {index}")
-                )
-            session.add(trace)
+    def insert_rows():
+        Trace.bulk_insert(session, trace_rows)
+        Annotation.bulk_insert(session, annotation_rows)
+        trace_rows.clear()
+        annotation_rows.clear()
 
-            # Required, so we can add annotations below, otherwise a foreign key constraint will fail.
-            # This does not commit yet, but makes sure the DB is aware of the transaction.
-            session.flush()
+    if validation_result["is_metadata_present"]:
+        # reassigned (not updated in place) so the JSON column change is tracked
+        dataset.extra_metadata = {
+            **dataset.extra_metadata,
+            **parsed_lines[0]["metadata"],
+        }
+        trace_lines = itertools.islice(parsed_lines, 1, None)
+    else:
+        trace_lines = parsed_lines
 
-            annotations = parsed_line.get("annotations", [])
-            for annotation in annotations:
-                if "address" not in annotation or "content" not in annotation:
-                    raise HTTPException(
-                        status_code=400,
-                        detail=f"Failed to parse annotation: {annotation}",
-                    )
-                annotation = Annotation(
-                    trace_id=trace.id,
-                    user_id=user_id,
-                    address=annotation["address"],
-                    content=annotation["content"],
-                    extra_metadata=annotation.get("extra_metadata", {}),
-                )
-                session.add(annotation)
+    # the whole file has one format (checked above), so pick the row builder once
+    if validation_result["has_raw_event_lists_format"]:
+        build_rows = raw_event_list_rows
+    elif validation_result["has_annotated_event_lists_format"]:
+        build_rows = annotated_event_list_rows
+    else:
+        trace_lines = []
 
-            if return_trace_data:
-                trace_ids.append(str(trace_id))
-                all_messages.append(parsed_line["messages"])
+    # the dataset has to exist before its traces, and traces before their annotations
+    session.flush()
+
+    # bound the number of traces (and so image files) being written at the same time
+    semaphore = asyncio.Semaphore(IMPORT_CONCURRENCY)
 
-        i = i + 1
+    async def build_rows_bounded(parsed_line):
+        async with semaphore:
+            return await build_rows(
+                parsed_line,
+                name,
+                user_id,
+                dataset.id,
+                validation_result["are_indices_present"],
+            )
+
+    trace_lines = iter(trace_lines)
+    while batch := list(itertools.islice(trace_lines, IMPORT_BATCH_SIZE)):
+        # rows of a batch are built concurrently, so image uploads of different
+        # traces overlap instead of being awaited one after another
+        tasks = [
+            asyncio.create_task(build_rows_bounded(parsed_line)) for parsed_line in batch
+        ]
+        try:
+            built_rows = await asyncio.gather(*tasks)
+        except BaseException:
+            # do not leave the rest of the batch writing images after a failure
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            raise
+        for trace_row, trace_annotation_rows, messages in built_rows:
+            trace_rows.append(trace_row)
+            annotation_rows.extend(trace_annotation_rows)
+            if return_trace_data:
+                trace_ids.append(str(trace_row["id"]))
+                all_messages.append(messages)
+        # write out each batch as we go, so built rows do not pile up for large files
+        # (all batches are still part of the caller's single transaction)
+        insert_rows()
 
     if return_trace_data:
         return dataset, trace_ids, all_messages
@@ -1,14 +1,16 @@
 import asyncio
 import base64
 import datetime
-import json
+import os
 import re
-import uuid
+from collections import defaultdict
 from typing import Any, List
 from uuid import UUID, uuid4
 
 import aiofiles
+import orjson
 import sqlalchemy.sql.sqltypes as sqltypes
+from cachetools import LRUCache
 from fastapi import HTTPException, Request
 from models.analyzer_model import Annotation as AnalyzerAnnotation
 from models.analyzer_model import InputSample as AnalyzerInputSample
@@ -24,13 +26,27 @@ from models.datasets_and_traces import (
 )
 from models.importers import import_jsonl
 from pydantic import BaseModel
-from sqlalchemy import and_
+from sqlalchemy import and_, exists
 from sqlalchemy.dialects.sqlite import insert as sqlite_upsert
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
 from sqlalchemy.sql.expression import cast
 from util.config import config
-from util.util import get_gravatar_hash, truncate_trace_content
+from util.util import get_gravatar_hash, orjson_dumps, truncate_trace_content
+
+# search query syntax (see query_traces)
+FILTER_PATTERN = re.compile(r"(is|not|meta):([^:\s]+)")
+META_FILTER_PATTERN = re.compile(r"([^\s><=\:]+)(<|>|<=|>=|=|==|%)([^\s><=]+)")
+# annotations for the analyzer model (see AnalyzerTraceExporter)
+ANALYZER_BRACKET_PATTERN = re.compile(r"\[.*\]")
+# sources of annotations made by the analyzer model, only used once reviewed by a user
+ANALYZER_ANNOTATION_SOURCES = frozenset({"analyzer-model", "accepted-analyzer-model"})
+# matches severity values from 0 to 1, e.g. "severity=0.5"
+SEVERITY_PATTERN = re.compile(r"severity=([0-1](?:\.\d+)?)")
+SEVERITY_STRIP_PATTERN = re.compile(r",?\s*severity=[0-1](?:\.\d+)?")
+
+# number of traces fetched per round trip when streaming an export
+EXPORT_FETCH_SIZE = 256
 
 
 class ExportConfig(BaseModel):
@@ -52,19 +68,6 @@ class ExportConfig(BaseModel):
         )
 
 
-class DBJSONEncoder(json.JSONEncoder):
-    """
-    JSON encoder that can handle UUIDs and datetime objects.
-    """
-
-    def default(self, obj):
-        if isinstance(obj, uuid.UUID):
-            return str(obj)
-        if isinstance(obj, datetime.datetime):
-            return obj.isoformat()
-        return json.JSONEncoder.default(self, obj)
-
-
 class AnalyzerTraceExporter:
     def __init__(self, user_id: str, dataset_id: str, dataset_name: str | None = None):
         self.user_id = user_id
@@ -73,16 +76,20 @@ class AnalyzerTraceExporter:
 
     @classmethod
     def is_annotation_for_analyzer(cls, content: str) -> bool:
-        return bool(re.search(r"\[.*\]", content)) or "@Invariant" in content
+        # plain substring checks first, the regex only runs if there is a "[" at all
+        return "@Invariant" in content or (
+            "[" in content and ANALYZER_BRACKET_PATTERN.search(content) is not None
+        )
 
     @classmethod
     def get_content_severity(cls, content: str) -> tuple[str, float]:
-        match = re.search(
-            r"severity=([0-1](?:\.\d+)?)", content
-        )  # Matches severity values from 0 to 1
+        # most annotations have no severity at all, skip the regex for those
+        if "severity=" not in content:
+            return content, None
+        match = SEVERITY_PATTERN.search(content)
         if match:
             severity = float(match.group(1))
-            content = re.sub(r",?\s*severity=[0-1](?:\.\d+)?", "", content).strip()
+            content = SEVERITY_STRIP_PATTERN.sub("", content).strip()
             return content, severity
         return content, None  # Return original string with severity=None if not found
 
@@ -165,27 +172,25 @@ class AnalyzerTraceExporter:
 
             for row in results:
                 trace, annotation = row.tuple()
-                samples_by_id.setdefault(
-                    str(trace.id),
-                    AnalyzerSample(
-                        trace=json.dumps(trace.content),
-                        id=str(trace.id),
+                trace_id = str(trace.id)
+                # a trace has one row per annotation, only build (and encode) its sample once
+                sample = samples_by_id.get(trace_id)
+                if sample is None:
+                    sample = samples_by_id[trace_id] = AnalyzerSample(
+                        trace=orjson.dumps(trace.content).decode(),
+                        id=trace_id,
                         annotations=[],
-                        domain=[push_ds_name] + trace.hierarchy_path + [str(trace.id)],
-                    ),
-                )
+                        domain=[push_ds_name, *trace.hierarchy_path, trace_id],
+                    )
                 if not annotation:
                     continue
-                if annotation.extra_metadata and (
-                    annotation.extra_metadata.get("source") == "analyzer-model"
-                    or annotation.extra_metadata.get("source")
-                    == "accepted-analyzer-model"
+                extra_metadata = annotation.extra_metadata or {}
+                review_status = extra_metadata.get("status")
+                if (
+                    extra_metadata.get("source") in ANALYZER_ANNOTATION_SOURCES
+                    and review_status not in ("accepted", "rejected")
                 ):
-                    if (
-                        annotation.extra_metadata.get("status") != "accepted"
-                        and annotation.extra_metadata.get("status") != "rejected"
-                    ):
-                        continue
+                    continue
 
                 if not AnalyzerTraceExporter.is_annotation_for_analyzer(
                     annotation.content
@@ -195,19 +200,13 @@ class AnalyzerTraceExporter:
                     annotation.content
                 )
                 status = "user-annotated"
-                if (
-                    annotation.extra_metadata
-                    and annotation.extra_metadata.get("status") == "rejected"
-                ):
+                if review_status == "rejected":
                     status = "user-rejected"
-                elif (
-                    annotation.extra_metadata
-                    and annotation.extra_metadata.get("status") == "accepted"
-                ):
+                elif review_status == "accepted":
                     status = "user-accepted"
 
                 # check for existing duplicates
-                samples_by_id[str(trace.id)].annotations.append(
+                sample.annotations.append(
                     AnalyzerAnnotation(
                         content=content,
                         location=annotation.address,
@@ -269,46 +268,52 @@ class TraceExporter:
         async def trace_generator():
             if self.export_config.include_trace_metadata:
                 # write out metadata message
-                yield json.dumps(dataset_metadata) + "\n"
+                yield orjson.dumps(dataset_metadata, option=orjson.OPT_APPEND_NEWLINE)
+
+            # load the annotations of all traces with one query instead of one per trace
+            if self.export_config.include_annotations:
+                annotations_by_trace = load_dataset_annotations(
+                    session, self.dataset_id
+                )
 
+            # traces are fetched in chunks from a server-side cursor while streaming,
+            # instead of loading the whole dataset before the first line is sent
             if self.export_config.only_annotated:
                 traces = (
                     session.query(Trace)
                     .filter(Trace.dataset_id == self.dataset_id)
-                    .join(Annotation, Trace.id == Annotation.trace_id)
-                    .group_by(Trace.id)
-                    .having(func.count(Annotation.id) > 0)
+                    .filter(has_annotations())
                     .order_by(Trace.index)
-                    .all()
+                    .yield_per(EXPORT_FETCH_SIZE)
                 )
             else:
                 traces = (
                     session.query(Trace)
                     .filter(Trace.dataset_id == self.dataset_id)
                     .order_by(Trace.index)
-                    .all()
+                    .yield_per(EXPORT_FETCH_SIZE)
                 )
 
             # write out traces
-            for trace in traces:
-                # load annotations for this trace
+            for i, trace in enumerate(traces, start=1):
                 annotations = (
-                    load_annotations(session, trace.id)
+                    annotations_by_trace.get(trace.id, [])
                     if self.export_config.include_annotations
                     else None
                 )
-                json_dict = await trace_to_exported_json(
+                yield await trace_to_exported_jsonl(
                     trace, annotations, self.export_config
                 )
-                yield json.dumps(json_dict, cls=DBJSONEncoder) + "\n"
 
-                # NOTE: if this operation becomes blocking, we can use asyncio.sleep(0) to yield control back to the event loop
+                # fetching and encoding does not await, so regularly give other requests a turn
+                if i % 64 == 0:
+                    await asyncio.sleep(0)
 
         return user, dataset_info, trace_generator
 
     async def traces(self, session: Session):
         """
-        Async generator that yields JSON strings for each trace in the dataset according to the export configuration.
+        Async generator that yields encoded JSON lines for each trace in the dataset according to the export configuration.
         """
         _, _, trace_generator = await self.prepare(session)
 
@@ -423,6 +428,23 @@ def load_annotations(session: Session, by):
     )
 
 
+def load_dataset_annotations(session: Session, dataset_id) -> dict:
+    """
+    Loads the (annotation, user) pairs of all traces in a dataset with a single query,
+    grouped by trace ID. Queried separately from the traces, so trace content is not
+    fetched once per annotation.
+    """
+    annotations_by_trace = defaultdict(list)
+    for annotation, user in (
+        session.query(Annotation, User)
+        .join(User, User.id == Annotation.user_id)
+        .join(Trace, Trace.id == Annotation.trace_id)
+        .filter(Trace.dataset_id == dataset_id)
+    ):
+        annotations_by_trace[annotation.trace_id].append((annotation, user))
+    return annotations_by_trace
+
+
 def get_query_filter(by, main_object, *other_objects, default_key="id"):
     if not isinstance(by, dict):
         by = {default_key: by}
@@ -525,7 +547,6 @@ def has_link_sharing(session: Session, trace_id: UUID):
 
 
 def save_user(session, userinfo):
-    print(userinfo, flush=True)
     user = {
         "id": userinfo["sub"],
         "username": userinfo.get("username", userinfo.get("preferred_username")),
@@ -540,18 +561,18 @@ def save_user(session, userinfo):
     # Check if this was an insert (new user) rather than an update
     if result.rowcount > 0:
         sample_data = []
-        with open("assets/sample_data.jsonl", "r") as f:
+        with open("assets/sample_data.jsonl", "rb") as f:
             for line in f:
-                sample_data.append(json.loads(line))
+                sample_data.append(orjson.loads(line))
         for data in sample_data:
             if "annotations" in data:
                 for ann in data["annotations"]:
                     ann["user"] = user
-        sample_jsonl = [json.dumps(item) + "\n" for item in sample_data]
+        sample_jsonl = [orjson.dumps(item) for item in sample_data]
 
         # Create metadata for the dataset
         metadata = {
-            "created_on": str(datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")),
+            "created_on": datetime.datetime.now().isoformat(sep=" ", timespec="seconds"),
             "topic": "question-answering",
         }
 
@@ -621,6 +642,12 @@ def annotation_to_json(annotation, user=None, **kwargs):
 ###
 
 
+# images larger than this are base64-encoded in a worker thread
+LARGE_IMAGE_BYTES = 256 * 1024
+# maximum number of local images of a trace read concurrently
+IMAGE_READ_CONCURRENCY = 32
+
+
 async def convert_local_image_link_to_base64(image_link, use_data_prefix=False):
     """Given an image link of the format: `local_img_link: /path/to/image.png` or `/path/to/image.png`,
     find the image from the local path and convert it to base64.
@@ -631,6 +658,12 @@ async def convert_local_image_link_to_base64(image_link, use_data_prefix=False):
     try:
         async with aiofiles.open(image_path, "rb") as image_file:
             file_content = await image_file.read()
+        if len(file_content) > LARGE_IMAGE_BYTES:
+            # encoding large images takes a while, keep it off the event loop
+            base64_image = (
+                await asyncio.to_thread(base64.b64encode, file_content)
+            ).decode("utf-8")
+        else:
             base64_image = base64.b64encode(file_content).decode("utf-8")
         if not use_data_prefix:
             return "local_base64_img: " + base64_image
@@ -642,9 +675,6 @@ async def convert_local_image_link_to_base64(image_link, use_data_prefix=False):
 
 async def images_to_base64(trace):
     """Converts local image links in the trace content to base64 encoded strings in place."""
-    if "uploader" in trace.extra_metadata:
-        trace.extra_metadata.pop("uploader")
-
     image_tasks = []
 
     for i, message in enumerate(trace.content):
@@ -688,7 +718,14 @@ async def images_to_base64(trace):
                         )
                     )
 
-    images = await asyncio.gather(*[task[0] for task in image_tasks])
+    # bound the number of image files that are open and read at the same time
+    semaphore = asyncio.Semaphore(IMAGE_READ_CONCURRENCY)
+
+    async def bounded(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    images = await asyncio.gather(*[bounded(task[0]) for task in image_tasks])
 
     for i, image in enumerate(images):
         if image is not None:
@@ -702,13 +739,24 @@ async def images_to_base64(trace):
                 ] = image
 
 
-async def trace_to_exported_json(trace, annotations=None, config: ExportConfig = None):
-    # Convert local image links to base64 encoded strings
-    await images_to_base64(trace)
+async def trace_to_exported_json(
+    trace, annotations=None, config: ExportConfig = None, messages=None
+):
+    """
+    Returns the exported JSON object of a trace. If given, messages is the trace content
+    with local images already inlined, and is exported in place of trace.content.
+    """
+    if "uploader" in trace.extra_metadata:
+        trace.extra_metadata.pop("uploader")
+
+    if messages is None:
+        # Convert local image links to base64 encoded strings
+        await images_to_base64(trace)
+        messages = trace.content
 
     out = {
         "index": trace.index,
-        "messages": trace.content,
+        "messages": messages,
         "metadata": trace.extra_metadata,
     }
 
@@ -724,6 +772,35 @@ async def trace_to_exported_json(trace, annotations=None, config: ExportConfig =
     return out
 
 
+# Image-inlined trace messages of recent exports, keyed by trace id and push time. Trace
+# content only changes on push, which bumps time_last_pushed, so stale entries are never
+# hit. Entries are (messages, size), bounded by the total size of the exported lines.
+exported_messages_cache = LRUCache(
+    maxsize=int(os.getenv("EXPORT_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+    getsizeof=lambda entry: entry[1],
+)
+
+
+async def trace_to_exported_jsonl(
+    trace, annotations=None, config: ExportConfig = None
+) -> bytes:
+    """
+    Like trace_to_exported_json, but returns the encoded JSON line. The image-inlined
+    messages are reused from exported_messages_cache on subsequent exports, which skips
+    reading and base64-encoding local images again.
+    """
+    cache_key = (trace.id, trace.time_last_pushed)
+    cached = exported_messages_cache.get(cache_key)
+    out = await trace_to_exported_json(
+        trace, annotations, config, messages=cached[0] if cached is not None else None
+    )
+    line = orjson_dumps(out, option=orjson.OPT_APPEND_NEWLINE)
+    # a single trace larger than the whole cache is not cached
+    if cached is None and len(line) <= exported_messages_cache.maxsize:
+        exported_messages_cache[cache_key] = (out["messages"], len(line))
+    return line
+
+
 def annotation_to_exported_json(annotation, user=None, **kwargs):
     out = {
         "content": annotation.content,
@@ -758,9 +835,16 @@ def dataset_to_json(dataset, user=None, include_metadata=True, **kwargs):
     return out
 
 
+def has_annotations():
+    """
+    Filter criterion for traces with at least one annotation. EXISTS lets the planner
+    stop at the first matching annotation per trace (via idx_annotations_trace_id),
+    instead of joining and aggregating all of them.
+    """
+    return exists().where(Annotation.trace_id == Trace.id)
+
+
 def query_traces(session, dataset, query, count=False):
-    filter_pattern = re.compile(r"(is|not|meta):([^:\s]+)")
-    meta_filter_pattern = re.compile(r"([^\s><=\:]+)(<|>|<=|>=|=|==|%)([^\s><=]+)")
     selected_traces = session.query(Trace).filter(Trace.dataset_id == dataset.id)
     search_term = None
 
@@ -769,7 +853,7 @@ def query_traces(session, dataset, query, count=False):
             search_terms = []
             filters = []
             for term in query.split(" "):
-                if match := filter_pattern.match(term):
+                if match := FILTER_PATTERN.match(term):
                     filters.append(match)
                 else:
                     search_terms.append(term)
@@ -785,23 +869,11 @@ def query_traces(session, dataset, query, count=False):
             for filter in filters:
                 filter_type, filter_term = filter.group(1), filter.group(2)
                 if filter_type == "is" and filter_term == "annotated":
-                    selected_traces = (
-                        selected_traces.join(
-                            Annotation, Trace.id == Annotation.trace_id
-                        )
-                        .group_by(Trace.id)
-                        .having(func.count(Annotation.id) > 0)
-                    )
+                    selected_traces = selected_traces.filter(has_annotations())
                 elif filter_type == "no" and filter_term == "annotated":
-                    selected_traces = (
-                        selected_traces.outerjoin(
-                            Annotation, Trace.id == Annotation.trace_id
-                        )
-                        .group_by(Trace.id)
-                        .having(func.count(Annotation.id) == 0)
-                    )
+                    selected_traces = selected_traces.filter(~has_annotations())
                 elif (
-                    match := meta_filter_pattern.match(filter_term)
+                    match := META_FILTER_PATTERN.match(filter_term)
                 ) and filter_type == "meta":
                     # we are in the setting where the user wants to filter by metadata
 
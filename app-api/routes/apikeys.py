@@ -1,9 +1,9 @@
 import datetime
 import os
-import re
 from typing import Annotated
 from uuid import UUID
 
+from cachetools import TTLCache
 from fastapi import Depends, FastAPI, HTTPException, Request
 from models.datasets_and_traces import APIKey, db
 from routes.auth import (
@@ -11,11 +11,21 @@ from routes.auth import (
     UserIdentity,
     DEVELOPER_USER,
     DEVELOPER_USER2,
+    is_dev_mode,
 )
 from sqlalchemy.orm import Session
+from util.util import ORJSONResponse
 
 # dataset routes
-apikeys = FastAPI()
+apikeys = FastAPI(default_response_class=ORJSONResponse)
+
+# short-lived cache of valid API keys (hashed key -> user id), so that clients pushing many
+# traces do not look up their key in the database on every request. Revoking a key evicts it
+# from this process' cache; other workers may accept it for up to APIKEY_CACHE_TTL seconds.
+apikey_cache = TTLCache(
+    maxsize=int(os.getenv("APIKEY_CACHE_MAX", 4096)),
+    ttl=float(os.getenv("APIKEY_CACHE_TTL", 60)),
+)
 
 
 @apikeys.post("/create")
@@ -33,16 +43,11 @@ async def create_apikey(user_id: Annotated[UUID, Depends(AuthenticatedUserIdenti
         )
 
         session.add(apikey)
+        # the id is assigned on flush, read it before commit expires the object
+        session.flush()
+        id = apikey.id
         session.commit()
 
-        # get the id of the new key
-        id = (
-            session.query(APIKey)
-            .filter(APIKey.hashed_key == str(hashed_key))
-            .first()
-            .id
-        )
-
     return {"id": id, "key": key}
 
 
@@ -88,9 +93,12 @@ def delete_apikey(
             )
 
         key.expired = True
+        hashed_key = key.hashed_key
 
         session.commit()
 
+    apikey_cache.pop(hashed_key, None)
+
     return {"success": True}
 
 
@@ -112,30 +120,33 @@ The resulting user identity looks like a UserIdentity object, but limited to the
 async def APIIdentity(request: Request) -> UUID:
     try:
         # check for DEV_MODE
-        if os.getenv("DEV_MODE") == "true" and "noauth" not in request.headers.get(
+        if is_dev_mode and "noauth" not in request.headers.get(
             "referer", []
         ):
             return UUID(DEVELOPER_USER["sub"])
         if (
             "noauth=user1" in request.headers.get("referer", [])
-            and os.getenv("DEV_MODE") == "true"
+            and is_dev_mode
         ):
             return UUID(DEVELOPER_USER2["sub"])
 
-        apikey = request.headers.get("Authorization")
-        bearer_token = re.match(r"Bearer (.+)", apikey)
-        if bearer_token is None:
+        authorization = request.headers.get("Authorization")
+        if not authorization or not authorization.startswith("Bearer "):
             raise HTTPException(
                 status_code=401, detail="You must provide a valid API key."
             )
 
-        apikey = bearer_token.group(1)
+        apikey = authorization[7:]
         hashed_key = APIKey.hash_key(apikey)
+        user_id = apikey_cache.get(hashed_key)
+        if user_id is not None:
+            return user_id
 
         with Session(db()) as session:
+            # single-row lookup on the hashed_key index, only loading the needed columns
             key = (
-                session.query(APIKey)
-                .filter(APIKey.hashed_key == str(hashed_key))
+                session.query(APIKey.user_id, APIKey.expired)
+                .filter(APIKey.hashed_key == hashed_key)
                 .first()
             )
             if key is None or key.expired:
@@ -143,6 +154,7 @@ async def APIIdentity(request: Request) -> UUID:
                     status_code=401, detail="You must provide a valid API key."
                 )
 
+            apikey_cache[hashed_key] = key.user_id
             return key.user_id
 
     except Exception:
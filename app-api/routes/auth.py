@@ -1,14 +1,18 @@
+import hashlib
 import json
 import os
 from typing import Annotated
 from uuid import UUID
 
+import httpx
+from cachetools import TTLCache
 from fastapi import Depends, HTTPException, Request
 from fastapi.responses import HTMLResponse, RedirectResponse
 from keycloak import KeycloakOpenID
 from util.config import config
 
 is_preview_deployment = os.getenv("PREVIEW") == "1"
+is_dev_mode = os.getenv("DEV_MODE") == "true"
 base_url = "https://" + os.getenv("APP_NAME") + ".invariantlabs.ai"
 client_id = config("authentication_client_id_prefix") + "-" + os.getenv("APP_NAME")
 
@@ -22,6 +26,64 @@ keycloak_openid = KeycloakOpenID(
     client_secret_key=os.getenv("KEYCLOAK_CLIENT_ID_SECRET"),
 )
 
+
+async def use_pooled_keycloak_client():
+    """
+    Replaces python-keycloak's async client with one that retries and keeps a larger
+    keep-alive pool (its own transport setup does not take effect), with the same TLS
+    settings (verify, cert) as the connection. All async Keycloak calls (identity lookups,
+    token refresh) then go through this one long-lived client.
+    """
+    connection = keycloak_openid.connection
+    previous_client = connection.async_s
+    connection.async_s = httpx.AsyncClient(
+        transport=httpx.AsyncHTTPTransport(
+            verify=connection.verify,
+            cert=connection.cert,
+            retries=1,
+            limits=httpx.Limits(max_keepalive_connections=64, max_connections=256),
+        ),
+    )
+    connection.async_s.auth = None
+    await previous_client.aclose()
+
+
+async def warm_up_keycloak_connection():
+    """
+    Establishes the Keycloak connection (DNS, TCP, TLS) ahead of the first authenticated request.
+    """
+    await use_pooled_keycloak_client()
+    await keycloak_openid.a_well_known()
+
+
+async def close_keycloak_connection():
+    """
+    Closes the shared Keycloak HTTP client (on application shutdown).
+    """
+    await keycloak_openid.connection.aclose()
+
+# short-lived cache of Keycloak userinfo responses, keyed by a digest of the access token,
+# so that the many API calls of one session do not each round-trip to Keycloak
+userinfo_cache = TTLCache(
+    maxsize=int(os.getenv("IDENTITY_CACHE_MAX", 10_000)),
+    ttl=float(os.getenv("IDENTITY_CACHE_TTL", 5)),
+)
+
+
+async def cached_userinfo(access_token: str) -> dict:
+    """
+    Returns the Keycloak userinfo for the given access token (cached for IDENTITY_CACHE_TTL seconds).
+
+    Only successful lookups are cached, the raw token is never stored.
+    """
+    key = hashlib.sha256(access_token.encode()).digest()[:16]
+    userinfo = userinfo_cache.get(key)
+    if userinfo is None:
+        userinfo = await keycloak_openid.a_userinfo(access_token)
+        userinfo_cache[key] = userinfo
+    return userinfo
+
+
 DEVELOPER_USER = {
     "sub": "3752ff38-da1a-4fa5-84a2-9e44a4b167ce",
     "email": "dev@mail.com",
@@ -106,8 +168,18 @@ async def write_back_refreshed_token(request: Request, call_next):
 
 async def UserIdentity(request: Request) -> UUID | None:
     # None stands for anonymous user
+    # the identity may already be resolved for this request (e.g. by the metrics middleware)
+    if hasattr(request.state, "user_id"):
+        return request.state.user_id
+
+    user_id = await resolve_user_identity(request)
+    request.state.user_id = user_id
+    return user_id
+
+
+async def resolve_user_identity(request: Request) -> UUID | None:
     # check for DEV_MODE
-    if os.getenv("DEV_MODE") == "true" and "noauth" not in request.headers.get(
+    if is_dev_mode and "noauth" not in request.headers.get(
         "referer", []
     ):
         request.state.userinfo = DEVELOPER_USER
@@ -121,7 +193,7 @@ async def UserIdentity(request: Request) -> UUID | None:
 
     if (
         "noauth=user1" in request.headers.get("referer", [])
-        and os.getenv("DEV_MODE") == "true"
+        and is_dev_mode
     ):
         request.state.userinfo = DEVELOPER_USER2
         # set jwt cookie for dev mode
@@ -136,14 +208,14 @@ async def UserIdentity(request: Request) -> UUID | None:
         token = json.loads(request.cookies.get("jwt"))
         try:
             # get user info (with current access token)
-            userinfo = await keycloak_openid.a_userinfo(token["access_token"])
+            userinfo = await cached_userinfo(token["access_token"])
         except Exception:
             # if the token is expired, try to refresh it
             token = await keycloak_openid.a_refresh_token(token["refresh_token"])
             # keep refreshed token in request state
             request.state.refreshed_token = token
 
-            userinfo = await keycloak_openid.a_userinfo(token["access_token"])
+            userinfo = await cached_userinfo(token["access_token"])
         request.state.userinfo = userinfo
 
         assert userinfo["sub"] is not None, "a logged-in user must have a sub"
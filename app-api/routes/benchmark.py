@@ -4,9 +4,10 @@ from fastapi import FastAPI, Request
 from models.datasets_and_traces import Dataset, User, db
 from sqlalchemy import Float, cast, desc, func
 from sqlalchemy.orm import Session
+from util.util import ORJSONResponse
 
 # dataset routes
-benchmark = FastAPI()
+benchmark = FastAPI(default_response_class=ORJSONResponse)
 
 """
 Public routes for listing and getting all public datasets that are linked to a given benchmark.
@@ -13,9 +13,10 @@ from routes.dataset.policy_checking import router as check_policy_on_dataset_rou
 from routes.dataset.jobs import router as jobs_router
 from routes.dataset.list import router as list_router
 from routes.dataset.queries import router as queries_router
+from util.util import ORJSONResponse
 
 # dataset routes
-dataset = FastAPI()
+dataset = FastAPI(default_response_class=ORJSONResponse)
 
 # Include all sub-routers
 dataset.include_router(crud_router)
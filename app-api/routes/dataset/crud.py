@@ -63,7 +63,7 @@ async def create(
     metadata = data.get("metadata", dict())
     if not isinstance(metadata, dict):
         raise HTTPException(status_code=400, detail="metadata must be a dictionary")
-    metadata["created_on"] = str(datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    metadata["created_on"] = datetime.now().isoformat(sep=" ", timespec="seconds")
 
     is_public = data.get("is_public", False)
     if not isinstance(is_public, bool):
@@ -123,12 +123,11 @@ async def upload_file(
                 )
 
     with Session(db()) as session:
-        lines = file.file.readlines()
         dataset, result_ids, messages = await import_jsonl(
             session,
             name,
             user_id,
-            lines,
+            file.file,
             existing_dataset=existing_dataset,
             is_public=is_public,
             return_trace_data=True,
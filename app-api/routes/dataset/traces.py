@@ -12,7 +12,7 @@ from models.queries import (
     ExportConfig,
     TraceExporter,
     dataset_to_json,
-    load_annotations,
+    load_dataset_annotations,
     query_traces,
     search_term_mappings,
     trace_to_json,
@@ -24,6 +24,9 @@ from sqlalchemy.orm import Session
 
 router = APIRouter()
 
+# matches a single violation line of an Invariant analyzer result, e.g. "PolicyViolation(...)"
+ANALYZER_VIOLATION_PATTERN = re.compile(r"[a-zA-Z]+\((.*)\)")
+
 
 @router.get("/byid/{id}/traces")
 def get_traces_by_id(
@@ -74,10 +77,10 @@ def search_dataset_by_name(
         }
 
         if query.strip() == "is:invariant":
-            pattern = re.compile(r"[a-zA-Z]+\((.*)\)")
             traces = session.query(Trace).filter(Trace.dataset_id == dataset.id).all()
+            annotations_by_trace = load_dataset_annotations(session, dataset.id)
             for trace in traces:
-                annotations = load_annotations(session, trace.id)
+                annotations = annotations_by_trace.get(trace.id, [])
                 trace_with_match = False
                 for annotation, _ in annotations:
                     # TODO replace with actual parsing
@@ -87,7 +90,7 @@ def search_dataset_by_name(
                         ].strip()
                         for line in violations.split("\n"):
                             line = line.strip()
-                            if match := pattern.match(line):
+                            if match := ANALYZER_VIOLATION_PATTERN.match(line):
                                 trace_with_match = True
                                 title = match.group(1).split(",")[0]
                                 if title not in result:
@@ -361,7 +364,8 @@ def get_all_traces(by: Dict[str, Any], user_id: UUID):
         out["traces"] = []
 
         traces = session.query(Trace).filter(Trace.dataset_id == dataset.id).all()
+        annotations_by_trace = load_dataset_annotations(session, dataset.id)
         for trace in traces:
-            annotations = load_annotations(session, trace.id)
+            annotations = annotations_by_trace.get(trace.id, [])
             out["traces"].append(trace_to_json(trace, annotations))
         return out
@@ -308,6 +308,8 @@ async def extract_and_save_batch_tool_calls(
         with Session(db()) as session:
             # Track all tool names across all traces for dataset-level registry
             all_dataset_tools = {}
+            # tool names extracted per trace (only traces with tool calls)
+            trace_tool_names = {}
 
             for i, (trace_id, messages) in enumerate(zip(trace_ids, messages_list)):
                 logger.info(f"Processing trace {i+1}/{len(trace_ids)}: {trace_id}")
@@ -340,35 +342,47 @@ async def extract_and_save_batch_tool_calls(
                     logger.info(
                         f"Extracted {len(tool_names)} unique tools from trace {trace_id}: {', '.join(tool_names.keys())}"
                     )
+                    trace_tool_names[str(trace_id)] = tool_names
+                else:
+                    logger.info(f"No tool calls found in trace {trace_id}")
 
-                    # Update the trace with the extracted tool names
-                    trace = session.query(Trace).filter(Trace.id == trace_id).first()
-                    if trace:
-                        # Initialize metadata dict if needed
-                        if not trace.extra_metadata:
-                            trace.extra_metadata = {}
-
-                        # Merge with existing tool names
-                        existing_tool_names = trace.extra_metadata.get("tool_calls", {})
-                        updated_tool_names = existing_tool_names | tool_names
+            # load all traces that need an update in one query (instead of one per trace)
+            traces = {}
+            if trace_tool_names:
+                traces = {
+                    str(trace.id): trace
+                    for trace in session.query(Trace).filter(
+                        Trace.id.in_(list(trace_tool_names.keys()))
+                    )
+                }
 
-                        # Log if new tools were added
-                        new_tools = set(updated_tool_names.keys()) - set(
-                            existing_tool_names.keys()
+            for trace_id, tool_names in trace_tool_names.items():
+                # Update the trace with the extracted tool names
+                trace = traces.get(trace_id)
+                if trace:
+                    # Initialize metadata dict if needed
+                    if not trace.extra_metadata:
+                        trace.extra_metadata = {}
+
+                    # Merge with existing tool names
+                    existing_tool_names = trace.extra_metadata.get("tool_calls", {})
+                    updated_tool_names = existing_tool_names | tool_names
+
+                    # Log if new tools were added
+                    new_tools = set(updated_tool_names.keys()) - set(
+                        existing_tool_names.keys()
+                    )
+                    if new_tools:
+                        logger.info(
+                            f"Adding {len(new_tools)} new tools to trace {trace_id}"
                         )
-                        if new_tools:
-                            logger.info(
-                                f"Adding {len(new_tools)} new tools to trace {trace_id}"
-                            )
-
-                        # Store in metadata
-                        trace.extra_metadata["tool_calls"] = updated_tool_names
-                        flag_modified(trace, "extra_metadata")
-                        logger.info(f"Updated metadata for trace {trace_id}")
-                    else:
-                        logger.warning(f"Trace {trace_id} not found in database")
+
+                    # Store in metadata
+                    trace.extra_metadata["tool_calls"] = updated_tool_names
+                    flag_modified(trace, "extra_metadata")
+                    logger.info(f"Updated metadata for trace {trace_id}")
                 else:
-                    logger.info(f"No tool calls found in trace {trace_id}")
+                    logger.warning(f"Trace {trace_id} not found in database")
 
             # Update dataset tool registry if we have a dataset and tools were found
             if dataset_id and user_id and all_dataset_tools:
@@ -14,7 +14,7 @@ import datetime
 from typing import Dict, List, Any, Optional
 import aiohttp
 import asyncio
-import json
+import orjson
 import re
 import uuid
 import fastapi
@@ -79,7 +79,38 @@ async def check_all_jobs(jwt: Optional[str] = None):
             logger.info("No jobs to check")
         else:
             logger.info(f"Checking {len(jobs)} pending jobs")
-        await asyncio.gather(*[check_job(session, job, jwt=jwt) for job in jobs])
+
+        # group jobs by endpoint and API key, so each group shares one client
+        job_groups: Dict[tuple, List[DatasetJob]] = {}
+        for job in jobs:
+            key = (job.extra_metadata.get("endpoint"), job.secret_metadata.get("apikey"))
+            job_groups.setdefault(key, []).append(job)
+
+        await asyncio.gather(
+            *[
+                check_jobs(session, endpoint, apikey, group, jwt=jwt)
+                for (endpoint, apikey), group in job_groups.items()
+            ]
+        )
+
+
+async def check_jobs(
+    session: Session,
+    endpoint: str,
+    apikey: Optional[str],
+    jobs: List[DatasetJob],
+    jwt: Optional[str] = None,
+):
+    """
+    Checks a group of jobs that run on the same endpoint with the same API key, using a single client.
+    """
+    try:
+        async with AnalysisClient(endpoint, apikey, jwt=jwt) as client:
+            await asyncio.gather(*[check_job(session, job, client) for job in jobs])
+    except Exception as e:
+        import traceback
+
+        logger.error(f"Error checking jobs on {endpoint}: {e}\n{traceback.format_exc()}")
 
 
 async def cancel_job(session: Session, job: DatasetJob, jwt: Optional[str] = None):
@@ -96,18 +127,16 @@ async def cancel_job(session: Session, job: DatasetJob, jwt: Optional[str] = Non
     except Exception as e:
         import traceback
 
-        print("Error cancelling job", job_id, e, traceback.format_exc(), flush=True)
+        logger.error(f"Error cancelling job {job_id}: {e}\n{traceback.format_exc()}")
 
 
-async def check_job(session: Session, job: DatasetJob, jwt: Optional[str] = None):
+async def check_job(session: Session, job: DatasetJob, client: AnalysisClient):
     """
-    Checks the status of all active jobs and updates their status in the database.
+    Checks the status of a job and updates its status in the database.
 
     If the job is done, it handles the result and deletes the job from the database.
     """
-    endpoint = job.extra_metadata.get("endpoint")
     job_id = job.extra_metadata.get("job_id")
-    apikey = job.secret_metadata.get("apikey")
     status = job.extra_metadata.get("status")
 
     # keep track of how many times we checked this job
@@ -118,58 +147,56 @@ async def check_job(session: Session, job: DatasetJob, jwt: Optional[str] = None
         flag_modified(job, "extra_metadata")
 
     try:
-        async with AnalysisClient(endpoint, apikey, jwt=jwt) as client:
-            job_progress = await client.status(job_id)
-            print(f"Job {job_id} has status {job_progress.status}", flush=True)
+        job_progress = await client.status(job_id)
+        logger.debug(f"Job {job_id} has status {job_progress.status}")
 
-            # Update job status
-            job.extra_metadata["status"] = job_progress.status.value
+        # Update job status
+        job.extra_metadata["status"] = job_progress.status.value
 
-            # Flag as modified immediately after updating status
-            flag_modified(job, "extra_metadata")
+        # Flag as modified immediately after updating status
+        flag_modified(job, "extra_metadata")
 
-            if job_progress.status == JobStatus.FAILED:
-                # Delete failed jobs after checking them a few times
-                # This avoids endless polling of jobs that will never succeed
-                if num_checked >= 3:  # After checking 3 times, delete the job
-                    print(
-                        f"Deleting failed job {job_id} after {num_checked} checks",
-                        flush=True,
-                    )
-                    await client.delete(job_id)
-                    session.delete(job)
-            elif job_progress.status == JobStatus.CANCELLED:
-                # delete cancelled jobs
-                await client.delete(job_id)
-                session.delete(job)
-            elif job_progress.status == JobStatus.COMPLETED:
-                if "num_total" in job.extra_metadata:
-                    job.extra_metadata["num_processed"] = job.extra_metadata[
-                        "num_total"
-                    ]
-                    flag_modified(job, "extra_metadata")
-
-                await handle_job_result(job, job_progress)
-                # delete job (so we don't handle the results again)
+        if job_progress.status == JobStatus.FAILED:
+            # Delete failed jobs after checking them a few times
+            # This avoids endless polling of jobs that will never succeed
+            if num_checked >= 3:  # After checking 3 times, delete the job
+                logger.info(
+                    f"Deleting failed job {job_id} after {num_checked} checks"
+                )
                 await client.delete(job_id)
                 session.delete(job)
-
-                # delete job with analysis service
-            elif job_progress.status == JobStatus.RUNNING:
-                job.extra_metadata["num_processed"] = job_progress.num_processed
-                job.extra_metadata["num_total"] = job_progress.total
-                # Flag as modified immediately after updating running job metrics
+        elif job_progress.status == JobStatus.CANCELLED:
+            # delete cancelled jobs
+            await client.delete(job_id)
+            session.delete(job)
+        elif job_progress.status == JobStatus.COMPLETED:
+            if "num_total" in job.extra_metadata:
+                job.extra_metadata["num_processed"] = job.extra_metadata[
+                    "num_total"
+                ]
                 flag_modified(job, "extra_metadata")
-            elif job_progress.status == JobStatus.PENDING:
-                # No additional updates needed for pending status
-                pass
 
-            # Commit changes after successful status update
-            try:
-                session.commit()
-            except Exception as e:
-                session.rollback()
-                logger.error(f"Error committing job status update for {job_id}: {e}")
+            await handle_job_result(job, job_progress)
+            # delete job (so we don't handle the results again)
+            await client.delete(job_id)
+            session.delete(job)
+
+            # delete job with analysis service
+        elif job_progress.status == JobStatus.RUNNING:
+            job.extra_metadata["num_processed"] = job_progress.num_processed
+            job.extra_metadata["num_total"] = job_progress.total
+            # Flag as modified immediately after updating running job metrics
+            flag_modified(job, "extra_metadata")
+        elif job_progress.status == JobStatus.PENDING:
+            # No additional updates needed for pending status
+            pass
+
+        # Commit changes after successful status update
+        try:
+            session.commit()
+        except Exception as e:
+            session.rollback()
+            logger.error(f"Error committing job status update for {job_id}: {e}")
 
     except aiohttp.ClientResponseError as e:
         if e.status == 404:
@@ -198,14 +225,13 @@ async def handle_job_result(job: DatasetJob, results: CompletedJobResponse):
         if job_type in JOB_HANDLERS:
             await JOB_HANDLERS[job_type](job, results)
         else:
-            print(f"No handler for job type {job_type}, job {job_id}", flush=True)
+            logger.warning(f"No handler for job type {job_type}, job {job_id}")
     except Exception as e:
         import traceback
 
-        print(
-            f"Error handling job result for {job_type}, job {job_id}: {e}", flush=True
+        logger.error(
+            f"Error handling job result for {job_type}, job {job_id}: {e}\n{traceback.format_exc()}"
         )
-        print(traceback.format_exc(), flush=True)
 
 
 @on_job_result("analysis")
@@ -248,7 +274,11 @@ async def on_analysis_result(job: DatasetJob, results: CompletedJobResponse):
         await update_dataset_metadata(
             job.user_id,
             dataset.name,
-            {"analysis_report": json.dumps(report, indent=2)},
+            {
+                "analysis_report": orjson.dumps(
+                    report, option=orjson.OPT_INDENT_2
+                ).decode()
+            },
         )
 
 
@@ -258,9 +288,7 @@ async def on_policy_synthesis_result(job: DatasetJob, results: CompletedJobRespo
     Handles the outcome of 'policy_synthesis' jobs.
     Stores the generated policy in the dataset metadata for persistence.
     """
-    print(
-        f"Policy synthesis job {job.extra_metadata.get('job_id')} completed", flush=True
-    )
+    logger.info(f"Policy synthesis job {job.extra_metadata.get('job_id')} completed")
 
     try:
         # Store policy results in dataset metadata for persistence
@@ -271,9 +299,8 @@ async def on_policy_synthesis_result(job: DatasetJob, results: CompletedJobRespo
                     session.query(Dataset).filter(Dataset.id == job.dataset_id).first()
                 )
                 if not dataset:
-                    print(
-                        f"Dataset {job.dataset_id} not found for policy job {job.id}",
-                        flush=True,
+                    logger.warning(
+                        f"Dataset {job.dataset_id} not found for policy job {job.id}"
                     )
                     return
 
@@ -307,29 +334,31 @@ async def on_policy_synthesis_result(job: DatasetJob, results: CompletedJobRespo
 
                 try:
                     session.commit()
-                    print(
-                        f"Stored policy for cluster {policy_data['cluster_name']} in dataset metadata",
-                        flush=True,
+                    logger.info(
+                        f"Stored policy for cluster {policy_data['cluster_name']} in dataset metadata"
                     )
                 except Exception as e:
                     session.rollback()
-                    print(f"Failed to commit policy to database: {e}", flush=True)
                     import traceback
 
-                    print(traceback.format_exc(), flush=True)
+                    logger.error(
+                        f"Failed to commit policy to database: {e}\n{traceback.format_exc()}"
+                    )
             except Exception as e:
                 # Handle session-specific errors
                 session.rollback()
-                print(f"Session error while storing policy: {e}", flush=True)
                 import traceback
 
-                print(traceback.format_exc(), flush=True)
+                logger.error(
+                    f"Session error while storing policy: {e}\n{traceback.format_exc()}"
+                )
     except Exception as e:
         # Handle general errors
         import traceback
 
-        print(f"Error storing policy synthesis results: {e}", flush=True)
-        print(traceback.format_exc(), flush=True)
+        logger.error(
+            f"Error storing policy synthesis results: {e}\n{traceback.format_exc()}"
+        )
 
 
 async def cleanup_stale_jobs(force_all: bool = False, user_id: UUID = None):
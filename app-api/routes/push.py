@@ -17,10 +17,14 @@ from routes.apikeys import APIIdentity
 from routes.dataset_metadata import extract_and_save_batch_tool_calls
 from routes.user import user_by_id
 from sqlalchemy.orm import Session
-from util.util import parse_and_update_messages, validate_dataset_name
+from util.util import (
+    ORJSONResponse,
+    parse_and_update_messages,
+    validate_dataset_name,
+)
 from util.validation import validate_annotation, validate_trace
 
-push = FastAPI()
+push = FastAPI(default_response_class=ORJSONResponse)
 logger = get_logger(__name__)
 
 """
@@ -162,23 +166,28 @@ async def push_trace(
                 session.commit()
 
                 if annotations is not None:
+                    annotation_rows = []
                     for i, trace_annotations in enumerate(annotations):
                         for ann in trace_annotations:
-                            new_annotation = Annotation(
-                                trace_id=result_ids[i],
-                                user_id=user_id,
-                                content=ann["content"],
-                                address=ann["address"],
-                                extra_metadata=ann.get("extra_metadata", None),
-                            )
+                            annotation_row = {
+                                "trace_id": result_ids[i],
+                                "user_id": user_id,
+                                "content": ann["content"],
+                                "address": ann["address"],
+                                "extra_metadata": ann.get("extra_metadata", None),
+                            }
                             try:
-                                validate_annotation(new_annotation, traces[i])
+                                validate_annotation(
+                                    Annotation(**annotation_row), traces[i]
+                                )
                             except Exception as e:
                                 # TODO: For now we just warn instead of throwing an error
                                 logger.warning(
                                     f"Error validating annotation {i}: {str(e)}"
                                 )
-                            session.add(new_annotation)
+                            annotation_rows.append(annotation_row)
+                    # inserted in one batch instead of through the per-object unit of work
+                    Annotation.bulk_insert(session, annotation_rows)
 
                 session.commit()
 
@@ -16,13 +16,12 @@ from models.analyzer_model import Annotation as AnalyzerAnnotation
 from models.datasets_and_traces import Annotation, Dataset, SharedLinks, Trace, User, db
 from models.queries import (
     AnalyzerTraceExporter,
-    DBJSONEncoder,
     annotation_to_json,
     has_link_sharing,
     load_annotations,
     load_dataset,
     load_trace,
-    trace_to_exported_json,
+    trace_to_exported_jsonl,
     trace_to_json,
 )
 from pydantic import ValidationError
@@ -38,10 +37,10 @@ from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.orm import Session
 from sqlalchemy.orm.attributes import flag_modified
 from util.analysis_api import AnalysisClient
-from util.util import delete_images, parse_and_update_messages
+from util.util import ORJSONResponse, delete_images, parse_and_update_messages
 from util.validation import validate_annotation
 
-trace = FastAPI()
+trace = FastAPI(default_response_class=ORJSONResponse)
 logger = get_logger(__name__)
 
 # static dataset name for snippets
@@ -150,8 +149,9 @@ async def download_trace(
     with Session(db()) as session:
         trace = load_trace(session, id, user_id, allow_public=True, allow_shared=True)
 
-        trace_data = await trace_to_exported_json(trace, load_annotations(session, id))
-        trace_data = json.dumps(trace_data, cls=DBJSONEncoder) + "\n"
+        trace_data = await trace_to_exported_jsonl(
+            trace, load_annotations(session, id)
+        )
 
         # Return a StreamingResponse with appropriate headers
         return Response(
@@ -316,7 +316,9 @@ async def analyze_trace(
                 async for chunk in client.stream(
                     method="POST",
                     url="/api/v1/analysis/stream",
-                    json=sar.model_dump(),
+                    # serialize the samples straight to JSON (no intermediate dicts)
+                    data=sar.model_dump_json(),
+                    headers={"Content-Type": "application/json"},
                     timeout=30,
                 ):
                     # TODO: replace with robust chunk parsing
@@ -424,19 +426,20 @@ async def replace_annotations(
 
     num_inserted = len(annotations)
 
-    for annotation in annotations:
-        if already_stored(annotation):
-            continue
-
-        new_annotation = Annotation(
-            trace_id=trace_id,
-            user_id=user_id,
-            address=annotation.get("address", "messages[0]") or "messages[0]",
-            content=str(annotation.get("content")),
-            extra_metadata=annotation.get("extra_metadata"),
-        )
-        session.add(new_annotation)
-
+    Annotation.bulk_insert(
+        session,
+        [
+            {
+                "trace_id": trace_id,
+                "user_id": user_id,
+                "address": annotation.get("address", "messages[0]") or "messages[0]",
+                "content": str(annotation.get("content")),
+                "extra_metadata": annotation.get("extra_metadata"),
+            }
+            for annotation in annotations
+            if not already_stored(annotation)
+        ],
+    )
     session.commit()
 
     return {"deleted": num_deleted, "inserted": num_inserted}
@@ -14,8 +14,9 @@ from routes.apikeys import UserOrAPIIdentity
 from routes.auth import AuthenticatedUserIdentity, UserIdentity
 from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session
+from util.util import ORJSONResponse
 
-user = FastAPI()
+user = FastAPI(default_response_class=ORJSONResponse)
 
 
 def user_by_id(user_id: UUID) -> User | None:
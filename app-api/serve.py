@@ -1,18 +1,32 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
 
 import fastapi
 from fastapi import HTTPException
+from fastapi.responses import Response
+from database.database_manager import DatabaseManager
+from logging_config import get_logger
 from metrics.active_users import install_metrics_middleware
 from prometheus_fastapi_instrumentator import Instrumentator, metrics
 from routes.apikeys import apikeys
-from routes.auth import write_back_refreshed_token
+from routes.auth import (
+    close_keycloak_connection,
+    is_dev_mode,
+    warm_up_keycloak_connection,
+    write_back_refreshed_token,
+)
 from routes.benchmark import benchmark
 from routes.dataset import dataset
 from routes.push import push
 from routes.trace import trace
 from routes.user import user
+from util.analysis_api import close_shared_connector
+from util.util import ORJSONResponse
 
-v1 = fastapi.FastAPI()
+logger = get_logger(__name__)
+
+v1 = fastapi.FastAPI(default_response_class=ORJSONResponse)
 
 # install the API routes
 v1.mount("/user", user)
@@ -23,19 +37,41 @@ v1.mount("/push", push)
 v1.mount("/benchmark", benchmark)
 
 
-# for debugging, we can check if the API is up
+# for debugging, we can check if the API is up (also used as a health check, so the body is precomputed)
+HOME_RESPONSE_BODY = b'{"message":"Hello v1"}'
+
+
 @v1.get("/")
 async def home():
-    return {"message": "Hello v1"}
+    return Response(content=HOME_RESPONSE_BODY, media_type="application/json")
+
+
+@asynccontextmanager
+async def lifespan(app: fastapi.FastAPI):
+    # open database connections before serving the first request
+    try:
+        await asyncio.to_thread(DatabaseManager.warm_up_pool)
+    except Exception as e:
+        logger.warning(f"Failed to warm up database connection pool: {e}")
+    # connect to Keycloak before the first identity lookup (not used in DEV_MODE)
+    if not is_dev_mode:
+        try:
+            await warm_up_keycloak_connection()
+        except Exception as e:
+            logger.warning(f"Failed to warm up Keycloak connection: {e}")
+    yield
+    # release pooled connections to the analysis API and Keycloak
+    await close_shared_connector()
+    await close_keycloak_connection()
 
 
 # mount the API under /api/v1
-app = fastapi.FastAPI()
+app = fastapi.FastAPI(lifespan=lifespan, default_response_class=ORJSONResponse)
 app.mount("/api/v1", v1)
 
 
 # enforces that the request knows the PROMETHEUS_TOKEN when requesting metrics
-def auth_metrics(request: fastapi.Request):
+async def auth_metrics(request: fastapi.Request):
     # in case of DEV_MODE, we don't require a token for metrics
     if os.getenv("DEV_MODE") == "true":
         return True
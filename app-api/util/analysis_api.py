@@ -1,6 +1,8 @@
+import os
 from typing import Dict, List, Any, Optional
 import aiohttp
 import fastapi
+import orjson
 
 from models.analyzer_model import (
     JobResponseUnion,
@@ -23,6 +25,33 @@ def cookies_xor_header(apikey: str | None = None, jwt: Optional[str] = None, def
         request_headers["Cookie"] = f"jwt={jwt}"
     return {'headers': request_headers, 'cookies': request_cookies}
 
+# connection pool shared by all AnalysisClient instances (keeps connections to the
+# analysis API alive across requests, instead of a new TCP/TLS handshake per client)
+_shared_connector: Optional[aiohttp.TCPConnector] = None
+
+
+def shared_connector() -> aiohttp.TCPConnector:
+    """
+    Returns the process-wide connector used for requests to the analysis API (created lazily).
+    """
+    global _shared_connector
+    if _shared_connector is None or _shared_connector.closed:
+        _shared_connector = aiohttp.TCPConnector(
+            limit=int(os.getenv("ANALYSIS_API_MAX_CONNECTIONS", 100))
+        )
+    return _shared_connector
+
+
+async def close_shared_connector() -> None:
+    """
+    Closes the shared connector (on application shutdown).
+    """
+    global _shared_connector
+    if _shared_connector is not None:
+        await _shared_connector.close()
+        _shared_connector = None
+
+
 class AnalysisClient:
     """
     API client for using the Invariant Analysis API (guardrails synthesis, analysis, etc.) from the Explorer backend.
@@ -41,14 +70,34 @@ class AnalysisClient:
         if jwt is None and request is not None:
             jwt = request.cookies.get("jwt")
         
-        if apikey:
-            headers = {"Authorization": f"Bearer {apikey}"}
-        elif jwt:
-            headers = {"Cookie": f"jwt={jwt}"}
-        else:
+        if not apikey and not jwt:
             raise ValueError("Either apikey or jwt must be provided")
-        
-        self.session = aiohttp.ClientSession(base_url=base_url, headers=headers)
+        headers = cookies_xor_header(apikey=apikey, jwt=jwt)["headers"]
+
+        # the connector is shared, so closing this session does not close its connections
+        self.session = aiohttp.ClientSession(
+            base_url=base_url,
+            headers=headers,
+            connector=shared_connector(),
+            connector_owner=False,
+        )
+
+    async def _request(self, method: str, url: str, allow_empty: bool = False, **kwargs) -> Any:
+        """
+        Performs a request against the analysis API and returns the parsed JSON response.
+
+        Arguments:
+            method (str): HTTP method.
+            url (str): The URL (relative to the base URL).
+            allow_empty (bool): Whether to return None for responses without content.
+            **kwargs: Additional keyword arguments for the request (e.g. json, headers, etc.).
+        """
+        async with self.session.request(method, url, **kwargs) as resp:
+            resp.raise_for_status()
+            if allow_empty and not resp.content_length:
+                return None
+            # parse the raw body directly (skips aiohttp's content-type check and stdlib json)
+            return orjson.loads(await resp.read())
 
     async def status(self, job_id: str) -> JobResponseUnion:
         """
@@ -56,7 +105,8 @@ class AnalysisClient:
         """
         async with self.session.get(f"/api/v1/analysis/job/{job_id}") as resp:
             resp.raise_for_status()
-            return JobResponseParser.model_validate(await resp.json()).root
+            # validate the raw JSON body in one pass (no intermediate dict)
+            return JobResponseParser.model_validate_json(await resp.read()).root
 
     async def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
         """
@@ -64,37 +114,29 @@ class AnalysisClient:
         Returns:
             Optional[Dict[str, Any]]: The response from the API, or None if no content.
         """
-        async with self.session.put(f"/api/v1/analysis/job/{job_id}/cancel") as resp:
-            resp.raise_for_status()
-            return await resp.json() if resp.content_length else None
+        return await self._request("PUT", f"/api/v1/analysis/job/{job_id}/cancel", allow_empty=True)
 
     async def delete(self, job_id: str) -> Optional[Dict[str, Any]]:
         """
         Deletes a job by its ID.
         """
-        async with self.session.delete(f"/api/v1/analysis/job/{job_id}") as resp:
-            resp.raise_for_status()
-            return await resp.json() if resp.content_length else None
+        return await self._request("DELETE", f"/api/v1/analysis/job/{job_id}", allow_empty=True)
 
     async def queue(self, payload: Dict[str, Any]) -> Dict[str, Any]:
         """
         Submits a job to the analysis API.
         """
-        async with self.session.post("/api/v1/analysis/job", json=payload) as resp:
-            resp.raise_for_status()
-            return await resp.json()
+        return await self._request("POST", "/api/v1/analysis/job", json=payload)
 
     async def jobs(self) -> List[Dict[str, Any]]:
         """
         Retrieves a list of all analysis jobs.
         """
-        async with self.session.get("/api/v1/analysis/job") as resp:
-            resp.raise_for_status()
-            return await resp.json()
+        return await self._request("GET", "/api/v1/analysis/job")
 
     async def close(self) -> None:
         """
-        Close the aiohttp session.
+        Close the aiohttp session (pooled connections are kept for reuse).
         """
         await self.session.close()
 
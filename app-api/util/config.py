@@ -1,8 +1,18 @@
+import functools
 import os
 
 import yaml
 
 
+@functools.lru_cache(maxsize=None)
+def load_config_file(config_file: str) -> dict:
+    """
+    Parses the given config file (once per process, config changes require a restart).
+    """
+    with open(config_file) as f:
+        return yaml.safe_load(f) or {}
+
+
 def config(key: str):
     """
     Reads the config file and returns the value of the key.
@@ -15,6 +25,4 @@ def config(key: str):
         The value of the key in the config file (str, int, list, dict depending on the config file).
     """
     config_file = os.getenv("CONFIG_FILE", "explorer.config.yml")
-    with open(config_file) as f:
-        config_obj = yaml.safe_load(f)
-        return config_obj.get(key)
+    return load_config_file(config_file).get(key)
@@ -3,6 +3,7 @@
 import asyncio
 import base64
 import copy
+import datetime
 import hashlib
 import json
 import os
@@ -12,14 +13,51 @@ import uuid
 from typing import Optional
 
 import aiofiles
+import orjson
 from fastapi import HTTPException
+from fastapi.responses import ORJSONResponse as FastAPIORJSONResponse
 from logging_config import get_logger
 
 DATASET_NAME_REGEX = re.compile(r"^[a-zA-Z0-9-_]+$")
+BASE64_IMAGE_DATA_URI_REGEX = re.compile(r"^data:image/[^;]+;base64,(.+)$")
 
 logger = get_logger(__name__)
 
 
+def _json_default(obj):
+    """Encodes the non-JSON types orjson supports natively, for the stdlib json fallback."""
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def orjson_dumps(obj, option: int = 0) -> bytes:
+    """
+    Encodes obj with orjson, falling back to the stdlib json module for values orjson
+    rejects but stdlib json accepts (integers wider than 64 bits, e.g. in uploaded traces).
+
+    Of the orjson options, the fallback only honours OPT_APPEND_NEWLINE.
+    """
+    try:
+        return orjson.dumps(obj, option=option)
+    except TypeError:
+        out = json.dumps(
+            obj, default=_json_default, ensure_ascii=False, separators=(",", ":")
+        ).encode()
+        return out + b"\n" if option & orjson.OPT_APPEND_NEWLINE else out
+
+
+class ORJSONResponse(FastAPIORJSONResponse):
+    """ORJSONResponse that falls back to the stdlib json module (see orjson_dumps)."""
+
+    def render(self, content) -> bytes:
+        return orjson_dumps(
+            content, option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        )
+
+
 def validate_dataset_name(name: str):
     """Validate the dataset name."""
     if name is None:
@@ -151,7 +189,7 @@ async def _handle_base64_image_in_content(dataset: str, trace_id: str, msg: dict
             raise IOError("Failed to save image to disk") from e
 
     def extract_base64_data(data_uri: str) -> str:
-        match = re.match(r"^data:image/[^;]+;base64,(.+)$", data_uri)
+        match = BASE64_IMAGE_DATA_URI_REGEX.match(data_uri)
         return match.group(1) if match else data_uri
 
     # If the message is a base64 image, save it to disk and update the message
@@ -200,6 +238,20 @@ async def _handle_tool_call_arguments(msg: dict):
     return msg
 
 
+def _needs_update(msg: dict) -> bool:
+    """Whether parse_and_update_messages may have to rewrite the message (cheap pre-check)."""
+    content = msg.get("content")
+    if isinstance(content, str) and content.startswith(
+        ("base64_img: ", "local_base64_img: ")
+    ):
+        return True
+    if isinstance(content, list) and any(
+        part.get("type") == "image_url" for part in content
+    ):
+        return True
+    return msg.get("role") == "assistant" and bool(msg.get("tool_calls", []))
+
+
 async def parse_and_update_messages(dataset: str, trace_id: str, messages: list[dict]):
     """
     Process messages:
@@ -222,8 +274,12 @@ async def parse_and_update_messages(dataset: str, trace_id: str, messages: list[
         if msg.get("role") == "assistant" and msg.get("tool_calls", []):
             msg = await _handle_tool_call_arguments(msg)
 
-    save_images = [parse_and_update_message(msg) for msg in messages]
-    await asyncio.gather(*save_images)
+    # most messages have neither images nor tool calls, only schedule the ones that do
+    save_images = [
+        parse_and_update_message(msg) for msg in messages if _needs_update(msg)
+    ]
+    if save_images:
+        await asyncio.gather(*save_images)
 
     return messages
 
@@ -289,3 +289,38 @@ async def test_push_trace_with_tool_call_arguments_not_parsed_successfully(
             messages_with_tool_calls[0]["tool_calls"][0]["function"]["arguments"]
             == '["fiction", "mystery"], ["Agatha Christie", "Dan Brown"]'
         )
+
+
+async def test_push_trace_with_big_integer(context, url):
+    """Tests that integers wider than 64 bits are stored and returned unchanged."""
+    big_integer = 2**70
+    async with TemporaryExplorerDataset(url, context, "") as dataset:
+        data = {
+            "messages": [
+                [
+                    {
+                        "role": "user",
+                        "content": "How big is it?",
+                        "data": {"value": big_integer},
+                    }
+                ]
+            ],
+            "annotations": None,
+            "metadata": [{"value": big_integer}],
+            "dataset": dataset["name"],
+        }
+
+        key = await get_apikey(url, context)
+        headers = {"Authorization": "Bearer " + key}
+        response = await context.request.post(
+            url + "/api/v1/push/trace", data=data, headers=headers
+        )
+        await expect(response).to_be_ok()
+        trace_id = (await response.json())["id"][0]
+
+        # get the trace and check that the integer was not truncated or turned into a float
+        response = await context.request.get(url + f"/api/v1/trace/{trace_id}")
+        await expect(response).to_be_ok()
+        trace = json.loads(await response.text())
+        assert trace["messages"][0]["data"]["value"] == big_integer
+        assert trace["extra_metadata"]["value"] == big_integer